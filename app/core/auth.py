@@ -1,19 +1,39 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
 import os
 import logging
-from datetime import datetime, timedelta
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
 from typing import Optional
 
-from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi.security import OAuth2PasswordBearer
 from fastapi import Depends, HTTPException, status, Request
 from pydantic import BaseModel
 
-# Re-export password helpers so callers use a single import path
-from app.core.password import validate_password, strength_report  # noqa: F401
+from app.core.db import db as _db
 
 logger = logging.getLogger("app.auth")
 
+# Password helpers are re-exported so callers use a single import path, but
+# lazily (PEP 562): app.core.password pulls in zxcvbn's dictionaries, which
+# cold-start paths that never touch passwords shouldn't pay for.
+_PASSWORD_EXPORTS = ("validate_password", "strength_report")
+
+
+def __getattr__(name):
+    if name in _PASSWORD_EXPORTS:
+        from app.core import password
+        for export in _PASSWORD_EXPORTS:
+            globals()[export] = getattr(password, export)
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 # ---------------------------------------------------------------------------
 # Secret key – MUST be set via environment variable.
 # Generate with: openssl rand -hex 32
@@ -32,17 +52,107 @@ SECRET_KEY = _SECRET_KEY
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30 * 24 * 60  # 30 days
 
+# Precomputed once: HS256 tokens all share the same header, and the HMAC key
+# never changes at runtime.
+_SECRET_BYTES = SECRET_KEY.encode()
+_HEADER_B64 = base64.urlsafe_b64encode(b'{"alg":"HS256","typ":"JWT"}').rstrip(b"=")
+
+
+def _b64url(data: bytes) -> bytes:
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+
+def _b64url_decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+# orjson's C parser is markedly faster on small payloads; fall back to stdlib
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:  # pragma: no cover
+    _json_loads = json.loads
+
+
+def _decode_token(token: str) -> Optional[dict]:
+    """
+    Verify an HS256 token and return its payload, or None if invalid.
+
+    The HMAC is checked before the payload JSON is touched, so garbage and
+    tampered tokens are rejected without a parse; `exp` is checked before
+    callers go on to hit the database.
+    """
+    try:
+        signing_input, _, sig_b64 = token.rpartition(".")
+        header_b64, _, payload_b64 = signing_input.partition(".")
+        if not header_b64 or not payload_b64:
+            return None
+        expected = hmac.new(_SECRET_BYTES, signing_input.encode("ascii"), hashlib.sha256).digest()
+        if not hmac.compare_digest(expected, _b64url_decode(sig_b64)):
+            return None
+        payload = _json_loads(_b64url_decode(payload_b64))
+        exp = payload.get("exp")
+        if exp is not None and time.time() >= exp:
+            return None
+        return payload
+    except Exception:
+        return None
+
 # Argon2 for all new hashes; existing pbkdf2_sha256 hashes still verify
 # transparently and are re-hashed to Argon2 on next successful login.
+# Parallelism defaults to 1: each login verifies a single hash on one worker
+# thread, so extra lanes only add CPU contention. Cost parameters are
+# overridable via environment for operators tuning to their hardware;
+# deprecated="auto" re-hashes older hashes (including p=2 ones) on login.
 pwd_context = CryptContext(
     schemes=["argon2", "pbkdf2_sha256"],
     deprecated="auto",
-    argon2__time_cost=3,        # iterations
-    argon2__memory_cost=65536,  # 64 MiB
-    argon2__parallelism=2,
+    argon2__time_cost=int(os.environ.get("ARGON2_TIME_COST", "3")),        # iterations
+    argon2__memory_cost=int(os.environ.get("ARGON2_MEMORY_KIB", "65536")),  # 64 MiB
+    argon2__parallelism=int(os.environ.get("ARGON2_PARALLELISM", "1")),
 )
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
+# Dedicated pool for Argon2 work, sized to half the cores: each hash pins a
+# 64 MiB working set, so capping concurrency keeps hashes cache-resident
+# instead of contending with FastAPI's general-purpose threadpool.
+_ARGON2_POOL = ThreadPoolExecutor(
+    max_workers=max(1, (os.cpu_count() or 2) // 2),
+    thread_name_prefix="argon2",
+)
+
+
+# ---------------------------------------------------------------------------
+# Token cache – memoizes jwt.decode + db.get_user per raw token string so
+# polling endpoints skip the HMAC verify and SQLite hit on every request.
+# Entries expire after a short TTL (picking up role/deactivation changes)
+# and never outlive the token's own `exp` claim.
+# ---------------------------------------------------------------------------
+_TOKEN_CACHE: dict = {}  # token -> (user_dict, exp_epoch, cached_at)
+_TOKEN_CACHE_LOCK = threading.Lock()
+_TOKEN_CACHE_TTL = 60  # seconds
+_TOKEN_CACHE_MAX = 4096
+
+
+def _token_cache_get(token: str) -> Optional[dict]:
+    now = time.time()
+    with _TOKEN_CACHE_LOCK:
+        entry = _TOKEN_CACHE.get(token)
+        if not entry:
+            return None
+        user, exp, cached_at = entry
+        if now - cached_at >= _TOKEN_CACHE_TTL or (exp is not None and now >= exp):
+            del _TOKEN_CACHE[token]
+            return None
+        return user
+
+
+def _token_cache_put(token: str, user: dict, exp: Optional[float]):
+    with _TOKEN_CACHE_LOCK:
+        if len(_TOKEN_CACHE) >= _TOKEN_CACHE_MAX:
+            _TOKEN_CACHE.clear()
+        _TOKEN_CACHE[token] = (user, exp, time.time())
+
 
 class Token(BaseModel):
     access_token: str
@@ -57,15 +167,58 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+def authenticate_user(username: str, password: str) -> Optional[dict]:
+    """
+    Return the user dict if the credentials are valid and the account is
+    active, else None.
+
+    Unknown and deactivated accounts run passlib's dummy verify instead of
+    a real Argon2 pass: response timing stays uniform, but the expensive
+    64 MiB hash is only ever computed against a stored hash that could
+    actually match.
+    """
+    user = _db.get_user(username)
+    if user is None or not user.get("is_active", 1):
+        pwd_context.dummy_verify()
+        return None
+    if not pwd_context.verify(password, user["password_hash"]):
+        return None
+    return user
+
+
+# Async variants run the blocking Argon2 work on the dedicated pool so the
+# event loop (and the default threadpool) stay free during logins.
+
+async def averify_password(plain_password: str, hashed_password: str) -> bool:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_ARGON2_POOL, pwd_context.verify, plain_password, hashed_password)
+
+
+async def aget_password_hash(password: str) -> str:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_ARGON2_POOL, pwd_context.hash, password)
+
+
+async def aauthenticate_user(username: str, password: str) -> Optional[dict]:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_ARGON2_POOL, authenticate_user, username, password)
+
+
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
+    # HS256 is just HMAC-SHA256 over b64(header).b64(payload); signing inline
+    # with the cached header/key skips jose's per-call algorithm registry and
+    # datetime handling. `exp` as a plain int is valid RFC 7519 NumericDate.
     to_encode = data.copy()
-    expire = datetime.utcnow() + (expires_delta or timedelta(minutes=15))
-    to_encode.update({"exp": expire})
-    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    expires = expires_delta.total_seconds() if expires_delta else 15 * 60
+    to_encode["exp"] = int(time.time() + expires)
+    payload_b64 = _b64url(json.dumps(to_encode, separators=(",", ":")).encode())
+    signing_input = _HEADER_B64 + b"." + payload_b64
+    sig = _b64url(hmac.new(_SECRET_BYTES, signing_input, hashlib.sha256).digest())
+    return (signing_input + b"." + sig).decode("ascii")
 
 
 async def get_current_user(request: Request):
@@ -83,19 +236,22 @@ async def get_current_user(request: Request):
     if not token:
         raise credentials_exception
 
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
-        token_data = TokenData(username=username)
-    except JWTError:
+    cached = _token_cache_get(token)
+    if cached is not None:
+        return cached
+
+    payload = _decode_token(token)
+    if payload is None:
+        raise credentials_exception
+    username: str = payload.get("sub")
+    if username is None:
         raise credentials_exception
+    token_data = TokenData(username=username)
 
-    from app.core.db import db
-    user = db.get_user(username=token_data.username)
+    user = _db.get_user(username=token_data.username)
     if user is None:
         raise credentials_exception
+    _token_cache_put(token, user, payload.get("exp"))
     return user
 
 
@@ -108,27 +264,34 @@ async def get_current_user_optional(request: Request):
     if not token:
         return None
 
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            return None
+    cached = _token_cache_get(token)
+    if cached is not None:
+        return cached
 
-        from app.core.db import db
-        user = db.get_user(username=username)
-        if not user:
-            logger.debug("Token references unknown user: %s", username)
-        return user
-    except JWTError as e:
-        logger.debug("JWT validation failed: %s", e)
+    payload = _decode_token(token)
+    if payload is None:
+        logger.debug("JWT validation failed")
+        return None
+    username: str = payload.get("sub")
+    if username is None:
         return None
 
+    user = _db.get_user(username=username)
+    if not user:
+        logger.debug("Token references unknown user: %s", username)
+    else:
+        _token_cache_put(token, user, payload.get("exp"))
+    return user
+
 
 def _extract_token(request: Request) -> Optional[str]:
     """Extract bearer token from cookie or Authorization header."""
     token = request.cookies.get("access_token")
-    if not token:
-        auth_header = request.headers.get("Authorization")
-        if auth_header and auth_header.startswith("Bearer "):
-            token = auth_header.split(" ", 1)[1]
-    return token
+    if token:
+        return token
+    auth_header = request.headers.get("Authorization")
+    # "Bearer " is 7 chars; a length check + slice beats startswith + split
+    # on this per-request path
+    if auth_header is not None and len(auth_header) > 7 and auth_header[:7] == "Bearer ":
+        return auth_header[7:]
+    return None
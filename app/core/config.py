@@ -1,3 +1,4 @@
+import threading
 from typing import Optional
 from pydantic import BaseModel
 from app.core.db import db
@@ -20,39 +21,67 @@ class SettingsModel(BaseModel):
 
 
 class ConfigManager:
-    @staticmethod
-    def get_settings() -> SettingsModel:
+    # All persisted setting keys, fetched in one SELECT
+    _KEYS = (
+        "download_dir", "library_dir", "default_format", "theme",
+        "filename_template", "cookies_path", "cookies_browser", "custom_args",
+        "auto_start_queue", "show_system_logs", "max_concurrent_downloads",
+        "max_retries", "enable_registration",
+    )
+
+    def __init__(self):
+        # Settings only change through update_settings, so the built model is
+        # memoized and rebuilt on write rather than re-queried per request.
+        self._cached: Optional[SettingsModel] = None
+        self._lock = threading.Lock()
+
+    def get_settings(self) -> SettingsModel:
+        with self._lock:
+            if self._cached is not None:
+                return self._cached
+            settings = self._load_settings()
+            self._cached = settings
+            return settings
+
+    def _load_settings(self) -> SettingsModel:
+        # Values arrive typed from SQLite (legacy 'text' rows are coerced by
+        # pydantic), so no per-field int()/lower() parsing is needed here.
+        vals = db.get_settings_bulk(ConfigManager._KEYS)
         return SettingsModel(
-            download_dir=db.get_setting("download_dir", "downloads") or "downloads",
-            library_dir=db.get_setting("library_dir", "downloads") or "downloads",
-            default_format=db.get_setting("default_format", "best"),
-            theme=db.get_setting("theme", "dark"),
-            filename_template=db.get_setting("filename_template", "%(title)s.%(ext)s"),
-            cookies_path=db.get_setting("cookies_path", ""),
-            cookies_browser=db.get_setting("cookies_browser", ""),
-            custom_args=db.get_setting("custom_args", ""),
-            auto_start_queue=db.get_setting("auto_start_queue", "false").lower() == "true",
-            show_system_logs=db.get_setting("show_system_logs", "true").lower() == "true",
-            max_concurrent_downloads=int(db.get_setting("max_concurrent_downloads", "3")),
-            max_retries=int(db.get_setting("max_retries", "3")),
-            enable_registration=db.get_setting("enable_registration", "true").lower() == "true",
+            download_dir=vals.get("download_dir") or "downloads",
+            library_dir=vals.get("library_dir") or "downloads",
+            default_format=vals.get("default_format", "best"),
+            theme=vals.get("theme", "dark"),
+            filename_template=vals.get("filename_template", "%(title)s.%(ext)s"),
+            cookies_path=vals.get("cookies_path", ""),
+            cookies_browser=vals.get("cookies_browser", ""),
+            custom_args=vals.get("custom_args", ""),
+            auto_start_queue=vals.get("auto_start_queue", False),
+            show_system_logs=vals.get("show_system_logs", True),
+            max_concurrent_downloads=vals.get("max_concurrent_downloads", 3),
+            max_retries=vals.get("max_retries", 3),
+            enable_registration=vals.get("enable_registration", True),
         )
 
-    @staticmethod
-    def update_settings(settings: SettingsModel):
-        db.set_setting("download_dir", settings.download_dir)
-        db.set_setting("library_dir", settings.library_dir)
-        db.set_setting("default_format", settings.default_format)
-        db.set_setting("theme", settings.theme)
-        db.set_setting("filename_template", settings.filename_template)
-        db.set_setting("cookies_path", settings.cookies_path or "")
-        db.set_setting("cookies_browser", settings.cookies_browser or "")
-        db.set_setting("custom_args", settings.custom_args or "")
-        db.set_setting("auto_start_queue", str(settings.auto_start_queue).lower())
-        db.set_setting("show_system_logs", str(settings.show_system_logs).lower())
-        db.set_setting("max_concurrent_downloads", str(settings.max_concurrent_downloads))
-        db.set_setting("max_retries", str(settings.max_retries))
-        db.set_setting("enable_registration", str(settings.enable_registration).lower())
+    def update_settings(self, settings: SettingsModel):
+        db.set_settings_bulk({
+            "download_dir": settings.download_dir,
+            "library_dir": settings.library_dir,
+            "default_format": settings.default_format,
+            "theme": settings.theme,
+            "filename_template": settings.filename_template,
+            "cookies_path": settings.cookies_path or "",
+            "cookies_browser": settings.cookies_browser or "",
+            "custom_args": settings.custom_args or "",
+            "auto_start_queue": settings.auto_start_queue,
+            "show_system_logs": settings.show_system_logs,
+            "max_concurrent_downloads": settings.max_concurrent_downloads,
+            "max_retries": settings.max_retries,
+            "enable_registration": settings.enable_registration,
+        })
+        # The new value is known, so rebuild the cache rather than invalidate
+        with self._lock:
+            self._cached = settings.copy()
 
 
 config = ConfigManager()
@@ -1,195 +1,354 @@
+import atexit
 import os
 import sqlite3
 import json
+import queue
+import threading
+import time
+from contextlib import contextmanager
 from typing import List, Dict, Optional
 
 # DB path is configurable; defaults to a 'data' volume-friendly location
 DB_PATH = os.environ.get("DB_PATH", "data/app.db")
 
+# orjson's C serializer is considerably faster for the extra_data blob;
+# fall back to stdlib json when it isn't installed.
+try:
+    import orjson
+
+    def _json_dumps(obj) -> str:
+        return orjson.dumps(obj).decode()
+except ImportError:  # pragma: no cover
+    _json_dumps = json.dumps
+
+# Applied once per pooled connection. WAL lets readers run concurrently with
+# the single writer; synchronous=NORMAL is safe under WAL and skips a fsync
+# per transaction — this is what keeps the downloader's batched progress
+# writes (many rows per BEGIN IMMEDIATE window) from turning into an fsync
+# storm under concurrent jobs.
+_CONN_PRAGMAS = (
+    # page_size only takes effect when the database file is first created
+    # (or after a manual VACUUM); 8 KiB halves B-tree depth vs the 4 KiB
+    # default for the jobs table's row sizes.
+    "PRAGMA page_size=8192",
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA cache_size=-20000",
+    "PRAGMA temp_store=memory",
+    "PRAGMA foreign_keys=ON",
+    # Memory-map reads straight from the OS page cache (no copy into the
+    # SQLite heap) — the job list scans are memory-bound.
+    "PRAGMA mmap_size=268435456",
+)
+
+
+# Columns returned by the job list queries. Deliberately omits the heavy
+# text fields (description, extra_data) that list views never render;
+# get_job() still returns everything for the detail/player paths.
+_JOB_LIST_COLS = (
+    "id, url, title, format_id, status, progress, filename, timestamp, "
+    "user_id, thumbnail, sub_id, error, view_count, duration, upload_date, "
+    "speed, eta, is_in_library, is_in_downloads, last_played"
+)
+
+
+# Static DDL, executed as one script in a single transaction at startup.
+_SCHEMA_SQL = """
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS users (
+    id TEXT PRIMARY KEY,
+    username TEXT UNIQUE,
+    password_hash TEXT,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    role TEXT DEFAULT 'user',
+    is_active INTEGER DEFAULT 1
+);
+
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    url TEXT,
+    title TEXT,
+    format_id TEXT,
+    status TEXT,
+    progress REAL,
+    filename TEXT,
+    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+    extra_data TEXT,
+    user_id TEXT,
+    thumbnail TEXT,
+    sub_id TEXT,
+    error TEXT,
+    view_count INTEGER,
+    description TEXT,
+    duration TEXT,
+    upload_date TEXT,
+    speed TEXT,
+    eta TEXT,
+    is_in_library INTEGER DEFAULT 0,
+    is_in_downloads INTEGER DEFAULT 1,
+    last_played DATETIME
+);
+
+CREATE TABLE IF NOT EXISTS conversions (
+    id TEXT PRIMARY KEY,
+    input TEXT,
+    target_format TEXT,
+    status TEXT,
+    progress REAL DEFAULT 0,
+    output_file TEXT,
+    error TEXT,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    started_at DATETIME
+);
+
+CREATE TABLE IF NOT EXISTS settings (
+    key TEXT PRIMARY KEY,
+    value TEXT,
+    type TEXT NOT NULL DEFAULT 'text'
+);
+
+CREATE TABLE IF NOT EXISTS system_logs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+    level TEXT,
+    message TEXT,
+    source TEXT
+);
+
+COMMIT;
+"""
+
+# Secondary indexes matching the hot query shapes (filter columns +
+# ORDER BY timestamp DESC prefix). Created after the column migrations so
+# they can reference columns added to pre-existing databases.
+_INDEX_SQL = """
+BEGIN;
+CREATE INDEX IF NOT EXISTS idx_jobs_user_ts ON jobs(user_id, timestamp DESC);
+CREATE INDEX IF NOT EXISTS idx_jobs_user_lib_ts ON jobs(user_id, is_in_library, timestamp DESC);
+CREATE INDEX IF NOT EXISTS idx_jobs_user_dl_ts ON jobs(user_id, is_in_downloads, timestamp DESC);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status);
+CREATE INDEX IF NOT EXISTS idx_logs_ts ON system_logs(timestamp DESC);
+COMMIT;
+"""
+
+# Columns added after the original release, applied only when actually
+# missing (diffed against PRAGMA table_info instead of try/except ALTERs).
+_MIGRATIONS = {
+    "jobs": {
+        "user_id": "TEXT",
+        "thumbnail": "TEXT",
+        "error": "TEXT",
+        "view_count": "INTEGER",
+        "description": "TEXT",
+        "duration": "TEXT",
+        "upload_date": "TEXT",
+        "speed": "TEXT",
+        "eta": "TEXT",
+        "is_in_library": "INTEGER DEFAULT 0",
+        "is_in_downloads": "INTEGER DEFAULT 1",
+        "last_played": "DATETIME",
+        "sub_id": "TEXT",
+    },
+    "users": {
+        "role": "TEXT DEFAULT 'user'",
+        "is_active": "INTEGER DEFAULT 1",
+    },
+    "settings": {
+        "type": "TEXT NOT NULL DEFAULT 'text'",
+    },
+}
+
+
+# IN (...) batches are padded to the next power of two so only ~log2(N)
+# distinct statement shapes ever reach SQLite's statement cache; anything
+# larger than this cap is split into chunks.
+_IN_CHUNK_MAX = 512
+
+
+def _fetch_dicts(cursor) -> List[Dict]:
+    """Materialize result rows as dicts via one cached column tuple.
+
+    Cheaper than dict(sqlite3.Row) per row, which re-walks the row keys
+    every time; the cursor should have row_factory unset so rows arrive
+    as plain tuples."""
+    cols = tuple(d[0] for d in cursor.description)
+    return [dict(zip(cols, row)) for row in cursor.fetchall()]
+
+
+def _padded_in(values: List[str]):
+    """Return (padded_values, placeholders) with the group rounded up to a
+    power of two. The pad sentinel '' never matches a real row id."""
+    n = len(values)
+    rounded = 1 << max(0, (n - 1).bit_length())
+    padded = list(values) + [""] * (rounded - n)
+    return padded, ",".join(["?"] * rounded)
+
 
 class DBHandler:
     def __init__(self):
         # Ensure the parent directory exists
         os.makedirs(os.path.dirname(DB_PATH) if os.path.dirname(DB_PATH) else ".", exist_ok=True)
+
+        # Long-lived connection pools: SQLite allows many concurrent readers
+        # under WAL but only one writer, so keep a single autocommit writer
+        # and a small pool of readers instead of opening a connection per call.
+        self._writer: queue.Queue = queue.Queue()
+        self._writer.put(self._new_conn(isolation_level=None))
+        self._readers: queue.Queue = queue.Queue()
+        for _ in range(max(4, os.cpu_count() or 1)):
+            self._readers.put(self._new_conn())
+
         self._init_db()
 
-    def _get_conn(self):
-        conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+        # Log writes are fire-and-forget: queue them and let a daemon thread
+        # batch many rows per transaction instead of one commit per message.
+        self._log_q: queue.Queue = queue.Queue()
+        threading.Thread(target=self._log_writer, daemon=True).start()
+        atexit.register(self._flush_logs)
+
+    def _new_conn(self, **kwargs) -> sqlite3.Connection:
+        conn = sqlite3.connect(DB_PATH, check_same_thread=False, cached_statements=256, **kwargs)
         conn.row_factory = sqlite3.Row
+        for pragma in _CONN_PRAGMAS:
+            conn.execute(pragma)
         return conn
 
+    @contextmanager
+    def _read(self):
+        conn = self._readers.get()
+        try:
+            yield conn
+        finally:
+            self._readers.put(conn)
+
+    @contextmanager
+    def _write(self):
+        conn = self._writer.get()
+        try:
+            yield conn
+        finally:
+            self._writer.put(conn)
+
     def _init_db(self):
-        conn = self._get_conn()
-        c = conn.cursor()
-
-        # User Table
-        c.execute('''CREATE TABLE IF NOT EXISTS users (
-            id TEXT PRIMARY KEY,
-            username TEXT UNIQUE,
-            password_hash TEXT,
-            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-            role TEXT DEFAULT 'user',
-            is_active INTEGER DEFAULT 1
-        )''')
-
-        # Jobs Table
-        c.execute('''CREATE TABLE IF NOT EXISTS jobs (
-            id TEXT PRIMARY KEY,
-            url TEXT,
-            title TEXT,
-            format_id TEXT,
-            status TEXT,
-            progress REAL,
-            filename TEXT,
-            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-            extra_data TEXT,
-            user_id TEXT,
-            thumbnail TEXT,
-            sub_id TEXT,
-            error TEXT,
-            view_count INTEGER,
-            description TEXT,
-            duration TEXT,
-            upload_date TEXT,
-            speed TEXT,
-            eta TEXT,
-            is_in_library INTEGER DEFAULT 0,
-            is_in_downloads INTEGER DEFAULT 1,
-            last_played DATETIME
-        )''')
-
-        # Settings Table
-        c.execute('''CREATE TABLE IF NOT EXISTS settings (
-            key TEXT PRIMARY KEY,
-            value TEXT
-        )''')
-
-        # System Logs Table
-        c.execute('''CREATE TABLE IF NOT EXISTS system_logs (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-            level TEXT,
-            message TEXT,
-            source TEXT
-        )''')
-
-        # ---------------------------------------------------------------
-        # Incremental migrations for databases created before full schema
-        # ---------------------------------------------------------------
-        _safe_alter(c, "ALTER TABLE jobs ADD COLUMN user_id TEXT")
-        _safe_alter(c, "ALTER TABLE jobs ADD COLUMN thumbnail TEXT")
-        _safe_alter(c, "ALTER TABLE jobs ADD COLUMN error TEXT")
-        _safe_alter(c, "ALTER TABLE jobs ADD COLUMN view_count INTEGER")
-        _safe_alter(c, "ALTER TABLE jobs ADD COLUMN description TEXT")
-        _safe_alter(c, "ALTER TABLE jobs ADD COLUMN duration TEXT")
-        _safe_alter(c, "ALTER TABLE jobs ADD COLUMN upload_date TEXT")
-        _safe_alter(c, "ALTER TABLE jobs ADD COLUMN speed TEXT")
-        _safe_alter(c, "ALTER TABLE jobs ADD COLUMN eta TEXT")
-        _safe_alter(c, "ALTER TABLE jobs ADD COLUMN is_in_library INTEGER DEFAULT 0")
-        _safe_alter(c, "ALTER TABLE jobs ADD COLUMN is_in_downloads INTEGER DEFAULT 1")
-        _safe_alter(c, "ALTER TABLE jobs ADD COLUMN last_played DATETIME")
-        _safe_alter(c, "ALTER TABLE jobs ADD COLUMN sub_id TEXT")
-        _safe_alter(c, "ALTER TABLE users ADD COLUMN role TEXT DEFAULT 'user'")
-        _safe_alter(c, "ALTER TABLE users ADD COLUMN is_active INTEGER DEFAULT 1")
-
-        conn.commit()
-        conn.close()
+        with self._write() as conn:
+            conn.executescript(_SCHEMA_SQL)
+            c = conn.cursor()
+
+            # Emit only the ALTER TABLE statements that are actually needed
+            alters = []
+            for table, columns in _MIGRATIONS.items():
+                existing = {row[1] for row in c.execute(f"PRAGMA table_info('{table}')")}
+                for col, decl in columns.items():
+                    if col not in existing:
+                        alters.append(f"ALTER TABLE {table} ADD COLUMN {col} {decl}")
+            if alters:
+                c.execute("BEGIN")
+                for stmt in alters:
+                    c.execute(stmt)
+                c.execute("COMMIT")
+
+            conn.executescript(_INDEX_SQL)
+
+            # Refresh planner statistics so the indexes get picked
+            c.execute("ANALYZE")
 
     # ------------------------------------------------------------------
     # User methods
     # ------------------------------------------------------------------
 
     def create_user(self, user_dict: Dict) -> bool:
-        conn = self._get_conn()
-        c = conn.cursor()
-        try:
-            role = user_dict.get("role", "user")
-            is_active = user_dict.get("is_active", 1)
+        with self._write() as conn:
+            c = conn.cursor()
+            try:
+                role = user_dict.get("role", "user")
+                is_active = user_dict.get("is_active", 1)
+                c.execute(
+                    "INSERT INTO users (id, username, password_hash, role, is_active) VALUES (?, ?, ?, ?, ?)",
+                    (user_dict["id"], user_dict["username"], user_dict["password_hash"], role, is_active),
+                )
+                return True
+            except sqlite3.IntegrityError:
+                return False
+
+    def get_user(self, username: str) -> Optional[Dict]:
+        with self._read() as conn:
+            c = conn.cursor()
+            c.execute("SELECT * FROM users WHERE username = ?", (username,))
+            row = c.fetchone()
+            return dict(row) if row else None
+
+    def get_user_by_id(self, user_id: str) -> Optional[Dict]:
+        with self._read() as conn:
+            c = conn.cursor()
+            c.execute("SELECT * FROM users WHERE id = ?", (user_id,))
+            row = c.fetchone()
+            return dict(row) if row else None
+
+    def get_all_users(self, limit: int = -1, offset: int = 0) -> List[Dict]:
+        # LIMIT -1 is SQLite for "no limit", so one statement shape covers
+        # both the paged and unpaged callers (password_hash stays projected
+        # out either way).
+        with self._read() as conn:
+            c = conn.cursor()
+            c.row_factory = None
             c.execute(
-                "INSERT INTO users (id, username, password_hash, role, is_active) VALUES (?, ?, ?, ?, ?)",
-                (user_dict["id"], user_dict["username"], user_dict["password_hash"], role, is_active),
+                "SELECT id, username, created_at, role, is_active FROM users "
+                "ORDER BY created_at DESC LIMIT ? OFFSET ?",
+                (limit, offset),
             )
-            conn.commit()
-            return True
-        except sqlite3.IntegrityError:
-            return False
-        finally:
-            conn.close()
+            return _fetch_dicts(c)
 
-    def get_user(self, username: str) -> Optional[Dict]:
-        conn = self._get_conn()
-        c = conn.cursor()
-        c.execute("SELECT * FROM users WHERE username = ?", (username,))
-        row = c.fetchone()
-        conn.close()
-        return dict(row) if row else None
-
-    def get_all_users(self) -> List[Dict]:
-        conn = self._get_conn()
-        c = conn.cursor()
-        c.execute("SELECT id, username, created_at, role, is_active FROM users ORDER BY created_at DESC")
-        rows = c.fetchall()
-        users = [dict(r) for r in rows]
-        conn.close()
-        return users
+    def count_users(self) -> int:
+        with self._read() as conn:
+            c = conn.cursor()
+            c.execute("SELECT COUNT(*) FROM users")
+            return c.fetchone()[0]
 
     def update_user(self, user_id: str, role: str = None, is_active: int = None):
-        conn = self._get_conn()
-        c = conn.cursor()
-        updates, params = [], []
-        if role is not None:
-            updates.append("role = ?")
-            params.append(role)
-        if is_active is not None:
-            updates.append("is_active = ?")
-            params.append(is_active)
-        if not updates:
-            conn.close()
+        if role is None and is_active is None:
             return
-        params.append(user_id)
-        c.execute(f"UPDATE users SET {', '.join(updates)} WHERE id = ?", tuple(params))
-        conn.commit()
-        conn.close()
+        # Fixed statement shape (COALESCE keeps unset fields) so SQLite's
+        # per-connection statement cache always hits.
+        with self._write() as conn:
+            c = conn.cursor()
+            c.execute(
+                "UPDATE users SET role = COALESCE(?, role), is_active = COALESCE(?, is_active) WHERE id = ?",
+                (role, is_active, user_id),
+            )
 
     def delete_user(self, user_id: str):
-        conn = self._get_conn()
-        c = conn.cursor()
-        c.execute("DELETE FROM users WHERE id = ?", (user_id,))
-        conn.commit()
-        conn.close()
+        with self._write() as conn:
+            c = conn.cursor()
+            c.execute("DELETE FROM users WHERE id = ?", (user_id,))
 
     def change_password(self, user_id: str, password_hash: str):
-        conn = self._get_conn()
-        c = conn.cursor()
-        c.execute("UPDATE users SET password_hash = ? WHERE id = ?", (password_hash, user_id))
-        conn.commit()
-        conn.close()
+        with self._write() as conn:
+            c = conn.cursor()
+            c.execute("UPDATE users SET password_hash = ? WHERE id = ?", (password_hash, user_id))
 
     # ------------------------------------------------------------------
     # Job methods
     # ------------------------------------------------------------------
 
     def add_job(self, job_dict: Dict):
-        conn = self._get_conn()
-        c = conn.cursor()
-        c.execute(
-            '''INSERT INTO jobs (id, url, title, format_id, status, progress, filename,
-               extra_data, user_id, thumbnail, sub_id, is_in_library, is_in_downloads)
-               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
-            (
-                job_dict["id"], job_dict["url"], job_dict["title"], job_dict["format_id"],
-                job_dict["status"], job_dict.get("progress", 0.0), job_dict.get("filename", ""),
-                json.dumps(job_dict), job_dict.get("user_id"), job_dict.get("thumbnail", ""),
-                job_dict.get("sub_id"), job_dict.get("is_in_library", 0), job_dict.get("is_in_downloads", 1),
-            ),
-        )
-        conn.commit()
-        conn.close()
+        with self._write() as conn:
+            c = conn.cursor()
+            c.execute(
+                '''INSERT INTO jobs (id, url, title, format_id, status, progress, filename,
+                   extra_data, user_id, thumbnail, sub_id, is_in_library, is_in_downloads)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+                (
+                    job_dict["id"], job_dict["url"], job_dict["title"], job_dict["format_id"],
+                    job_dict["status"], job_dict.get("progress", 0.0), job_dict.get("filename", ""),
+                    _json_dumps(job_dict), job_dict.get("user_id"), job_dict.get("thumbnail", ""),
+                    job_dict.get("sub_id"), job_dict.get("is_in_library", 0), job_dict.get("is_in_downloads", 1),
+                ),
+            )
 
     def get_all_jobs(self, user_id: str = None, only_downloads: bool = False) -> List[Dict]:
-        conn = self._get_conn()
-        c = conn.cursor()
-        query = "SELECT * FROM jobs"
+        query = f"SELECT {_JOB_LIST_COLS} FROM jobs"
         params: List = []
         conditions = []
         if user_id:
@@ -200,46 +359,44 @@ class DBHandler:
         if conditions:
             query += " WHERE " + " AND ".join(conditions)
         query += " ORDER BY timestamp DESC"
-        c.execute(query, tuple(params))
-        rows = c.fetchall()
-        jobs = [dict(r) for r in rows]
-        conn.close()
-        return jobs
+        with self._read() as conn:
+            c = conn.cursor()
+            c.row_factory = None
+            c.execute(query, tuple(params))
+            return _fetch_dicts(c)
 
     def get_job(self, job_id: str) -> Optional[Dict]:
-        conn = self._get_conn()
-        c = conn.cursor()
-        c.execute("SELECT * FROM jobs WHERE id = ?", (job_id,))
-        row = c.fetchone()
-        conn.close()
-        return dict(row) if row else None
+        with self._read() as conn:
+            c = conn.cursor()
+            c.execute("SELECT * FROM jobs WHERE id = ?", (job_id,))
+            row = c.fetchone()
+            return dict(row) if row else None
 
     def get_jobs_by_ids(self, job_ids: List[str]) -> List[Dict]:
         if not job_ids:
             return []
-        conn = self._get_conn()
-        c = conn.cursor()
-        placeholders = ",".join(["?"] * len(job_ids))
-        c.execute(f"SELECT * FROM jobs WHERE id IN ({placeholders})", tuple(job_ids))
-        rows = c.fetchall()
-        jobs = [dict(r) for r in rows]
-        conn.close()
+        jobs: List[Dict] = []
+        with self._read() as conn:
+            c = conn.cursor()
+            c.row_factory = None
+            for i in range(0, len(job_ids), _IN_CHUNK_MAX):
+                padded, placeholders = _padded_in(job_ids[i:i + _IN_CHUNK_MAX])
+                c.execute(f"SELECT {_JOB_LIST_COLS} FROM jobs WHERE id IN ({placeholders})", padded)
+                jobs.extend(_fetch_dicts(c))
         return jobs
 
     def get_library_jobs(self, user_id: str = None) -> List[Dict]:
-        conn = self._get_conn()
-        c = conn.cursor()
-        if user_id:
-            c.execute(
-                "SELECT * FROM jobs WHERE user_id = ? AND is_in_library = 1 ORDER BY timestamp DESC",
-                (user_id,),
-            )
-        else:
-            c.execute("SELECT * FROM jobs WHERE is_in_library = 1 ORDER BY timestamp DESC")
-        rows = c.fetchall()
-        jobs = [dict(r) for r in rows]
-        conn.close()
-        return jobs
+        with self._read() as conn:
+            c = conn.cursor()
+            c.row_factory = None
+            if user_id:
+                c.execute(
+                    f"SELECT {_JOB_LIST_COLS} FROM jobs WHERE user_id = ? AND is_in_library = 1 ORDER BY timestamp DESC",
+                    (user_id,),
+                )
+            else:
+                c.execute(f"SELECT {_JOB_LIST_COLS} FROM jobs WHERE is_in_library = 1 ORDER BY timestamp DESC")
+            return _fetch_dicts(c)
 
     def update_job_status(
         self,
@@ -251,164 +408,302 @@ class DBHandler:
         eta: str = None,
         filename: str = None,
     ):
-        conn = self._get_conn()
-        c = conn.cursor()
-        query = "UPDATE jobs SET status = ?"
-        params = [status]
-        if progress is not None:
-            query += ", progress = ?"
-            params.append(progress)
-        if error_msg is not None:
-            query += ", error = ?"
-            params.append(error_msg)
-        if speed is not None:
-            query += ", speed = ?"
-            params.append(speed)
-        if eta is not None:
-            query += ", eta = ?"
-            params.append(eta)
-        if filename is not None:
-            query += ", filename = ?"
-            params.append(filename)
-        query += " WHERE id = ?"
-        params.append(job_id)
-        c.execute(query, tuple(params))
-        conn.commit()
-        conn.close()
+        # One fixed statement covers every call-site shape: COALESCE leaves a
+        # column untouched when the caller passed None, so the SQL string is
+        # identical on every call and stays hot in the statement cache.
+        with self._write() as conn:
+            c = conn.cursor()
+            c.execute(
+                """UPDATE jobs SET status = ?,
+                       progress = COALESCE(?, progress),
+                       error = COALESCE(?, error),
+                       speed = COALESCE(?, speed),
+                       eta = COALESCE(?, eta),
+                       filename = COALESCE(?, filename)
+                   WHERE id = ?""",
+                (status, progress, error_msg, speed, eta, filename, job_id),
+            )
 
     def update_job_sub_id(self, job_id: str, sub_id: str):
-        conn = self._get_conn()
-        c = conn.cursor()
-        c.execute("UPDATE jobs SET sub_id = ? WHERE id = ?", (sub_id, job_id))
-        conn.commit()
-        conn.close()
+        with self._write() as conn:
+            c = conn.cursor()
+            c.execute("UPDATE jobs SET sub_id = ? WHERE id = ?", (sub_id, job_id))
 
     def update_job_library_status(
         self, job_ids: List[str], is_in_library: int, is_in_downloads: Optional[int] = None
     ):
-        conn = self._get_conn()
-        c = conn.cursor()
-        placeholders = ",".join(["?"] * len(job_ids))
-        if is_in_downloads is not None:
-            c.execute(
-                f"UPDATE jobs SET is_in_library = ?, is_in_downloads = ? WHERE id IN ({placeholders})",
-                (is_in_library, is_in_downloads, *job_ids),
-            )
-        else:
-            c.execute(
-                f"UPDATE jobs SET is_in_library = ? WHERE id IN ({placeholders})",
-                (is_in_library, *job_ids),
-            )
-        conn.commit()
-        conn.close()
+        with self._write() as conn:
+            c = conn.cursor()
+            for i in range(0, len(job_ids), _IN_CHUNK_MAX):
+                padded, placeholders = _padded_in(job_ids[i:i + _IN_CHUNK_MAX])
+                if is_in_downloads is not None:
+                    c.execute(
+                        f"UPDATE jobs SET is_in_library = ?, is_in_downloads = ? WHERE id IN ({placeholders})",
+                        (is_in_library, is_in_downloads, *padded),
+                    )
+                else:
+                    c.execute(
+                        f"UPDATE jobs SET is_in_library = ? WHERE id IN ({placeholders})",
+                        (is_in_library, *padded),
+                    )
 
     def update_job_metadata(
         self, job_id: str, view_count=None, description=None, duration=None, upload_date=None
     ):
-        conn = self._get_conn()
-        c = conn.cursor()
-        c.execute(
-            "UPDATE jobs SET view_count = ?, description = ?, duration = ?, upload_date = ? WHERE id = ?",
-            (view_count, description, duration, upload_date, job_id),
-        )
-        conn.commit()
-        conn.close()
+        with self._write() as conn:
+            c = conn.cursor()
+            c.execute(
+                "UPDATE jobs SET view_count = ?, description = ?, duration = ?, upload_date = ? WHERE id = ?",
+                (view_count, description, duration, upload_date, job_id),
+            )
 
     def update_job_filename(self, job_id: str, new_path: str):
-        conn = self._get_conn()
-        c = conn.cursor()
-        c.execute("UPDATE jobs SET filename = ? WHERE id = ?", (new_path, job_id))
-        conn.commit()
-        conn.close()
+        with self._write() as conn:
+            c = conn.cursor()
+            c.execute("UPDATE jobs SET filename = ? WHERE id = ?", (new_path, job_id))
 
     def update_last_played(self, job_id: str):
-        conn = self._get_conn()
-        c = conn.cursor()
-        c.execute("UPDATE jobs SET last_played = CURRENT_TIMESTAMP WHERE id = ?", (job_id,))
-        conn.commit()
-        conn.close()
+        with self._write() as conn:
+            c = conn.cursor()
+            c.execute("UPDATE jobs SET last_played = CURRENT_TIMESTAMP WHERE id = ?", (job_id,))
 
     def increment_view_count(self, job_id: str):
-        conn = self._get_conn()
-        c = conn.cursor()
-        c.execute(
-            "UPDATE jobs SET view_count = COALESCE(view_count, 0) + 1 WHERE id = ?",
-            (job_id,),
-        )
-        conn.commit()
-        conn.close()
+        with self._write() as conn:
+            c = conn.cursor()
+            c.execute(
+                "UPDATE jobs SET view_count = COALESCE(view_count, 0) + 1 WHERE id = ?",
+                (job_id,),
+            )
 
     def delete_job(self, job_id: str):
-        conn = self._get_conn()
-        c = conn.cursor()
-        c.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
-        conn.commit()
-        conn.close()
+        with self._write() as conn:
+            c = conn.cursor()
+            c.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+
+    def update_job_progress_batch(self, rows):
+        """Apply many in-flight progress updates in one transaction.
+
+        ``rows`` is an iterable of (job_id, status, progress, filename)
+        tuples from the downloader's progress batcher. Updates only land
+        while the job is still downloading, so a late flush can never
+        overwrite a terminal status written directly.
+        """
+        with self._write() as conn:
+            c = conn.cursor()
+            c.execute("BEGIN IMMEDIATE")
+            try:
+                c.executemany(
+                    """UPDATE jobs SET status = ?,
+                           progress = COALESCE(?, progress),
+                           filename = COALESCE(?, filename)
+                       WHERE id = ? AND status = 'downloading'""",
+                    [(status, progress, filename, job_id)
+                     for job_id, status, progress, filename in rows],
+                )
+                c.execute("COMMIT")
+            except Exception:
+                c.execute("ROLLBACK")
+                raise
+
+    # ------------------------------------------------------------------
+    # Conversion methods
+    # ------------------------------------------------------------------
+
+    def add_conversion(self, job_id: str, input_name: str, target_format: str):
+        with self._write() as conn:
+            c = conn.cursor()
+            c.execute(
+                "INSERT INTO conversions (id, input, target_format, status) VALUES (?, ?, ?, 'queued')",
+                (job_id, input_name, target_format),
+            )
+
+    def get_conversion(self, job_id: str) -> Optional[Dict]:
+        with self._read() as conn:
+            c = conn.cursor()
+            c.execute("SELECT * FROM conversions WHERE id = ?", (job_id,))
+            rows = _fetch_dicts(c)
+            return rows[0] if rows else None
+
+    def get_conversions_by_status(self, status: str) -> List[Dict]:
+        with self._read() as conn:
+            c = conn.cursor()
+            c.execute(
+                "SELECT * FROM conversions WHERE status = ? ORDER BY created_at",
+                (status,),
+            )
+            return _fetch_dicts(c)
+
+    def update_conversion(
+        self,
+        job_id: str,
+        status: str = None,
+        progress: float = None,
+        output_file: str = None,
+        error: str = None,
+    ):
+        # Same COALESCE shape as update_job_status: one statement for every
+        # call-site combination, hot in the statement cache.
+        with self._write() as conn:
+            c = conn.cursor()
+            c.execute(
+                """UPDATE conversions SET
+                       status = COALESCE(?, status),
+                       progress = COALESCE(?, progress),
+                       output_file = COALESCE(?, output_file),
+                       error = COALESCE(?, error),
+                       started_at = CASE WHEN ? = 'processing'
+                                         THEN CURRENT_TIMESTAMP
+                                         ELSE started_at END
+                   WHERE id = ?""",
+                (status, progress, output_file, error, status, job_id),
+            )
+
+    def update_conversion_progress_batch(self, progress_by_id: Dict[str, float]):
+        """One transaction for a window's worth of progress snapshots.
+
+        The status guard keeps a late-flushed percentage from overwriting a
+        row that already moved to completed/error.
+        """
+        if not progress_by_id:
+            return
+        with self._write() as conn:
+            c = conn.cursor()
+            c.execute("BEGIN IMMEDIATE")
+            try:
+                c.executemany(
+                    "UPDATE conversions SET progress = ? WHERE id = ? AND status = 'processing'",
+                    [(p, jid) for jid, p in progress_by_id.items()],
+                )
+                c.execute("COMMIT")
+            except Exception:
+                c.execute("ROLLBACK")
+                raise
 
     def clear_completed_jobs(self):
-        conn = self._get_conn()
-        c = conn.cursor()
-        c.execute("DELETE FROM jobs WHERE status = 'completed' AND (is_in_library = 0 OR is_in_library IS NULL)")
-        c.execute("UPDATE jobs SET is_in_downloads = 0 WHERE status = 'completed' AND is_in_library = 1")
-        conn.commit()
-        conn.close()
+        # One transaction (and one fsync) for both statements; both range-scan
+        # the same idx_jobs_status entries.
+        with self._write() as conn:
+            c = conn.cursor()
+            c.execute("BEGIN IMMEDIATE")
+            c.execute("DELETE FROM jobs WHERE status = 'completed' AND COALESCE(is_in_library, 0) = 0")
+            c.execute("UPDATE jobs SET is_in_downloads = 0 WHERE status = 'completed' AND is_in_library = 1")
+            c.execute("COMMIT")
 
     def clear_failed_jobs(self):
-        conn = self._get_conn()
-        c = conn.cursor()
-        c.execute("DELETE FROM jobs WHERE (status = 'error' OR status = 'canceled')")
-        conn.commit()
-        conn.close()
+        with self._write() as conn:
+            c = conn.cursor()
+            c.execute("DELETE FROM jobs WHERE (status = 'error' OR status = 'canceled')")
 
     # ------------------------------------------------------------------
     # Settings methods
     # ------------------------------------------------------------------
 
+    # Settings are stored with a type tag so SQLite hands back int/bool
+    # values directly instead of Python re-parsing strings on every read.
+    # Rows written before the tag existed stay 'text' and still coerce fine.
+    _TYPED_VALUE = (
+        "CASE type WHEN 'int' THEN CAST(value AS INTEGER) "
+        "WHEN 'bool' THEN value = 'true' ELSE value END AS value"
+    )
+
+    @staticmethod
+    def _setting_row(key: str, value) -> tuple:
+        if isinstance(value, bool):
+            return (key, "true" if value else "false", "bool")
+        if isinstance(value, int):
+            return (key, str(value), "int")
+        return (key, value, "text")
+
     def get_setting(self, key: str, default=None):
-        conn = self._get_conn()
-        c = conn.cursor()
-        c.execute("SELECT value FROM settings WHERE key = ?", (key,))
-        row = c.fetchone()
-        conn.close()
-        return row["value"] if row else default
-
-    def set_setting(self, key: str, value: str):
-        conn = self._get_conn()
-        c = conn.cursor()
-        c.execute("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)", (key, value))
-        conn.commit()
-        conn.close()
+        with self._read() as conn:
+            c = conn.cursor()
+            c.execute(f"SELECT {self._TYPED_VALUE} FROM settings WHERE key = ?", (key,))
+            row = c.fetchone()
+            return row["value"] if row else default
+
+    def get_settings_bulk(self, keys) -> Dict[str, object]:
+        """Fetch several settings in one SELECT instead of a query per key."""
+        placeholders = ",".join(["?"] * len(keys))
+        with self._read() as conn:
+            c = conn.cursor()
+            c.execute(
+                f"SELECT key, {self._TYPED_VALUE} FROM settings WHERE key IN ({placeholders})",
+                tuple(keys),
+            )
+            return {r["key"]: r["value"] for r in c.fetchall()}
+
+    def set_setting(self, key: str, value):
+        with self._write() as conn:
+            c = conn.cursor()
+            c.execute(
+                "INSERT OR REPLACE INTO settings (key, value, type) VALUES (?, ?, ?)",
+                self._setting_row(key, value),
+            )
+
+    def set_settings_bulk(self, items: Dict[str, object]):
+        """Upsert several settings in a single transaction."""
+        rows = [self._setting_row(k, v) for k, v in items.items()]
+        with self._write() as conn:
+            c = conn.cursor()
+            c.execute("BEGIN")
+            c.executemany("INSERT OR REPLACE INTO settings (key, value, type) VALUES (?, ?, ?)", rows)
+            c.execute("COMMIT")
 
     # ------------------------------------------------------------------
     # Log methods
     # ------------------------------------------------------------------
 
     def add_log(self, level: str, message: str, source: str = "system"):
-        conn = self._get_conn()
-        c = conn.cursor()
-        c.execute(
-            "INSERT INTO system_logs (level, message, source) VALUES (?, ?, ?)",
-            (level, message, source),
-        )
-        conn.commit()
-        conn.close()
+        self._log_q.put((level, message, source))
+
+    def _log_writer(self):
+        """Daemon loop: drain the log queue in batches of up to 256 rows or
+        250 ms of waiting, whichever comes first, then insert them in one
+        transaction."""
+        while True:
+            batch = [self._log_q.get()]
+            deadline = time.monotonic() + 0.25
+            while len(batch) < 256:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._log_q.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            self._write_log_batch(batch)
+
+    def _write_log_batch(self, batch: List[tuple]):
+        try:
+            with self._write() as conn:
+                c = conn.cursor()
+                c.execute("BEGIN IMMEDIATE")
+                c.executemany(
+                    "INSERT INTO system_logs (level, message, source) VALUES (?, ?, ?)",
+                    batch,
+                )
+                c.execute("COMMIT")
+        except Exception:
+            # Logging must never take the app down
+            pass
+
+    def _flush_logs(self):
+        """atexit hook: write out anything still queued."""
+        batch = []
+        try:
+            while True:
+                batch.append(self._log_q.get_nowait())
+        except queue.Empty:
+            pass
+        if batch:
+            self._write_log_batch(batch)
 
     def get_logs(self, limit: int = 100) -> List[Dict]:
-        conn = self._get_conn()
-        c = conn.cursor()
-        c.execute("SELECT * FROM system_logs ORDER BY timestamp DESC LIMIT ?", (limit,))
-        rows = c.fetchall()
-        logs = [dict(r) for r in rows]
-        conn.close()
-        return logs
-
-
-def _safe_alter(cursor, sql: str):
-    """Run an ALTER TABLE statement, silently ignoring 'duplicate column' errors."""
-    try:
-        cursor.execute(sql)
-    except sqlite3.OperationalError:
-        pass
+        with self._read() as conn:
+            c = conn.cursor()
+            c.row_factory = None
+            c.execute("SELECT * FROM system_logs ORDER BY timestamp DESC LIMIT ?", (limit,))
+            return _fetch_dicts(c)
 
 
 db = DBHandler()
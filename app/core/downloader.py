@@ -2,22 +2,75 @@
 
 import yt_dlp
 import subprocess
+import functools
+import json
+import logging
 import os
+import shutil
+import threading
+import traceback
 import uuid
 import asyncio
 import sys
 import re
 from typing import List, Optional, Dict
+from concurrent.futures import ThreadPoolExecutor
 import time
+from contextlib import contextmanager
+from types import MappingProxyType
+from urllib.parse import urlparse
 from pydantic import BaseModel
 from enum import Enum
 from pathlib import Path
 from app.core.config import config
+from app.core.db import db
+
+logger = logging.getLogger("app.downloader")
+
+# Diagnostic chatter (per-line/per-call [DEBUG] prints) is opt-in: each print
+# takes the stdout lock and a write syscall, which adds up on hot paths.
+_DEBUG = os.environ.get("GRABSTER_DEBUG") == "1"
+
+
+def _ytdlp_version() -> str:
+    # Resolved once at import; importlib.metadata walks site-packages
+    # dist-info dirs on every lookup.
+    try:
+        import importlib.metadata
+        return importlib.metadata.version('yt-dlp')
+    except Exception:
+        return "Unknown"
+
+
+_YTDLP_VERSION = _ytdlp_version()
+
+# pip's success line, e.g. "Successfully installed yt-dlp-2024.4.9"
+_PIP_INSTALLED_RE = re.compile(r'Successfully installed yt-dlp-(\S+)')
+
+# YouTube .info.json sidecars run to hundreds of KB; orjson parses them
+# several times faster than stdlib json. Same fallback shape as db.py.
+try:
+    import orjson
+
+    def _json_loads_file(path: str):
+        with open(path, 'rb') as fh:
+            return orjson.loads(fh.read())
+except ImportError:  # pragma: no cover
+    def _json_loads_file(path: str):
+        with open(path, 'r', encoding='utf-8') as fh:
+            return json.load(fh)
+
+# Compiled once: strip_ansi_codes runs several times per progress tick per
+# active download, so the per-call compile (re's cache lookup included) adds up
+_ANSI_RE = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
+
+
 
 def strip_ansi_codes(text: str) -> str:
     """Remove ANSI escape codes from text."""
-    ansi_escape = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
-    return ansi_escape.sub('', text)
+    if '\x1b' not in text:
+        return text
+    return _ANSI_RE.sub('', text)
 
 class DownloadStatus(str, Enum):
     QUEUED = "queued"
@@ -65,16 +118,155 @@ class DownloadJob(BaseModel):
     is_in_downloads: int = 1
     last_played: Optional[str] = None
 
+# Resolution buckets for _process_info, highest first; the final catch-all
+# threshold is 0 so every format lands somewhere.
+_RES_BUCKETS = (
+    (3840, "2160p"),
+    (2560, "1440p"),
+    (1920, "1080p"),
+    (1280, "720p"),
+    (854, "480p"),
+    (640, "360p"),
+    (426, "240p"),
+    (0, "144p"),
+)
+_RES_ORDER = {res: threshold for threshold, res in _RES_BUCKETS}
+
+
+# User agent matching the android player clients used below
+_ANDROID_UA = 'Mozilla/5.0 (Linux; Android 10; K) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Mobile Safari/537.36'
+
+# Constant download options shared by every client attempt; read-only so the
+# per-attempt overlay is just one dict literal. Per-job keys (format, outtmpl,
+# progress_hooks) and per-instance keys (ffmpeg_location, cachedir,
+# extractor_args) live in the overlay.
+_DOWNLOAD_BASE_OPTS = MappingProxyType({
+    'quiet': False,
+    'no_warnings': False,
+    'merge_output_format': 'mp4',
+    'force_ipv4': True,
+    'socket_timeout': 15,
+    'verbose': True,
+    # Sidecar metadata lets the resolution guard run after a single
+    # download pass instead of a separate dry run
+    'writeinfojson': True,
+    'clean_infojson': False,
+    'user_agent': _ANDROID_UA,
+})
+
+# Direct stream-URL extraction (in-process replacement for `yt-dlp -g`)
+_STREAM_BASE_OPTS = MappingProxyType({
+    'quiet': True,
+    'no_warnings': True,
+    'skip_download': True,
+    'format': 'bv*[ext=mp4]+ba[ext=m4a]/b[ext=mp4]/best',
+})
+
+# Constant subset of fetch_info's options
+_FETCH_BASE_OPTS = MappingProxyType({
+    'quiet': True,
+    'no_warnings': True,
+    'user_agent': _ANDROID_UA,
+    'extractor_args': {'youtube': {'player_client': ['android_creator']}},
+})
+
+
+@functools.lru_cache(maxsize=1)
+def _resolve_ffmpeg() -> Optional[str]:
+    """Locate ffmpeg once: the bundled bin/ copy wins, else $PATH.
+
+    shutil.which stats every $PATH entry, so this used to run on each
+    download attempt and metadata fetch.
+    """
+    bundled = os.path.join(os.getcwd(), 'bin', 'ffmpeg.exe')
+    if os.path.exists(bundled):
+        return bundled
+    return shutil.which('ffmpeg')
+
+# How long a learned-good player client stays preferred for a host before
+# the chain order falls back to the default.
+_GOOD_CLIENT_TTL = 3600
+
+# Fetched video metadata stays valid long enough to cover the preview ->
+# download window; signed stream URLs inside it expire after ~6h, so stay
+# well under that.
+_INFO_CACHE_TTL = 4 * 3600
+
+
+class ProgressWriter:
+    """Coalesces progress updates into batched SQLite transactions.
+
+    Progress hooks from every active download submit here instead of
+    writing to the database directly; a single asyncio task drains the
+    queue and flushes at most every ``FLUSH_INTERVAL`` seconds (or when
+    ``MAX_BATCH`` distinct jobs have updates), keeping commits at O(1)
+    per interval instead of O(hooks x jobs).
+    """
+
+    MAX_BATCH = 64
+    FLUSH_INTERVAL = 0.5
+
+    def __init__(self):
+        self._queue: Optional[asyncio.Queue] = None
+        self._loop = None
+        self._task = None
+
+    def ensure_started(self, loop):
+        if self._task is None or self._task.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._task = loop.create_task(self._run())
+
+    def submit_nowait(self, job_id: str, status: str, progress: float, filename: str = None):
+        """Thread-safe enqueue from the download worker threads."""
+        if self._loop is None:
+            return
+        try:
+            self._loop.call_soon_threadsafe(
+                self._queue.put_nowait, (job_id, status, progress, filename)
+            )
+        except RuntimeError:
+            pass  # loop shut down mid-download
+
+    async def _run(self):
+        while True:
+            item = await self._queue.get()
+            # Keep only the newest update per job within the window
+            batch = {item[0]: item}
+            deadline = self._loop.time() + self.FLUSH_INTERVAL
+            while len(batch) < self.MAX_BATCH:
+                timeout = deadline - self._loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                batch[item[0]] = item
+            try:
+                await asyncio.to_thread(db.update_job_progress_batch, list(batch.values()))
+            except Exception as e:
+                print(f"[PROGRESS_WRITER] Batch flush failed: {e}")
+
+
 class DownloadManager:
     def __init__(self):
         # Load settings
-        from app.core.config import config
         settings = config.get_settings()
         self.download_dir = settings.download_dir
         os.makedirs(self.download_dir, exist_ok=True)
+
+        # Persistent yt-dlp cache (player JS, signature functions). Without
+        # an explicit cachedir yt-dlp can land on a non-persistent default in
+        # bundled builds and re-fetch base.js on every call.
+        self._ytdlp_cachedir = os.path.join(self.download_dir, '.ytdlp_cache')
+        os.makedirs(self._ytdlp_cachedir, exist_ok=True)
+
+        # Resolved once; every ydl option dict reuses it
+        self.ffmpeg_path = _resolve_ffmpeg()
+        print(f"[INIT] ffmpeg location: {self.ffmpeg_path or 'not found'}")
         
         # Load jobs from DB
-        from app.core.db import db
         self.jobs: Dict[str, DownloadJob] = {}
         self.progress_callback = None
         self.processes: Dict[str, asyncio.subprocess.Process] = {}
@@ -98,12 +290,183 @@ class DownloadManager:
                 last_played=j.get('last_played')
             )
         
-        # Concurrency Control
-        self.semaphore = asyncio.Semaphore(settings.max_concurrent_downloads)
+        # Concurrency Control: a bounded pool of long-lived worker tasks
+        # draining a job queue. Workers stay warm across jobs (reusing the
+        # process-wide extractor/session state built up by the first job)
+        # instead of gating fresh coroutines through a semaphore. Spawned
+        # lazily on the first enqueue, once an event loop exists.
+        self._max_workers = settings.max_concurrent_downloads
+        self._job_queue: Optional[asyncio.Queue] = None
+        self._workers: list = []
+        # Job ids whose progress changed since the last websocket emit;
+        # drained by _emitter_loop at 10 Hz so a fast download produces one
+        # coroutine per tick instead of one per parsed progress line
+        self._dirty_jobs: set = set()
+        self._emitter_task: Optional[asyncio.Task] = None
+
+        # Dedicated threads for the blocking yt-dlp work. Long downloads on
+        # the loop's default executor would starve FastAPI's sync endpoints
+        # and asyncio.to_thread callers; a private pool sized to the worker
+        # count keeps them isolated. (A process pool would also sidestep the
+        # GIL during signature decipher, but the path is network-bound and
+        # progress/job state lives in this process, so threads are the right
+        # trade here.)
+        self._download_pool = ThreadPoolExecutor(
+            max_workers=self._max_workers,
+            thread_name_prefix="download",
+        )
+
+        # Metadata fetches get their own pool too: /api/fetch bursts would
+        # otherwise queue behind whatever else is on asyncio's default
+        # executor (and vice versa) while yt-dlp waits on the network.
+        self._fetch_pool = ThreadPoolExecutor(
+            max_workers=8,
+            thread_name_prefix="ytdlp-fetch",
+        )
+        # In-flight fetch_info tasks keyed by URL; concurrent requests for
+        # the same video share one extraction (single-flight)
+        self._inflight_info: Dict[str, asyncio.Task] = {}
+
+        # Metadata cache: the user previews formats (fetch_info) right before
+        # queueing a download, so keep the extract_info result around and skip
+        # the second network round-trip in start_download.
+        self._info_cache: Dict[str, tuple] = {}  # url -> (expiry, info dict)
+        self._info_cache_lock = threading.Lock()
+
+        # Last player client that actually worked, per extractor host. When
+        # the first chain entry is broken (YouTube API churn), every job
+        # would otherwise eat a failed attempt before falling through.
+        self._last_good_client: Dict[str, tuple] = {}  # host -> (client, ts)
+        self._good_client_lock = threading.Lock()
+
+        # Persistent YoutubeDL instances, keyed by their option dict. A fresh
+        # YoutubeDL() re-registers every extractor and opens a new HTTP
+        # session, so metadata fetches pay DNS + TLS on every call; reusing
+        # the instance keeps connections alive. Each instance carries its own
+        # lock because extract_info is not safe to run concurrently.
+        self._ydl_pool: Dict[str, tuple] = {}  # opts key -> (ydl, lock)
+        self._ydl_pool_lock = threading.Lock()
+
+        # Batched writer for in-flight progress; started on first download
+        # once an event loop is running
+        self._progress_writer = ProgressWriter()
+
+        # Cookie-file existence is a stat(2) per stream/extract call; cache
+        # the answer briefly so repeat extraction doesn't re-stat each time
+        self._cookies_stat: tuple = ("", False, 0.0)  # (path, exists, checked_at)
+
+    def _cookies_file(self, path: str) -> bool:
+        """os.path.exists(path) with a short-lived per-path cache."""
+        cached_path, exists, checked_at = self._cookies_stat
+        now = time.time()
+        if path == cached_path and now - checked_at < 5.0:
+            return exists
+        exists = os.path.exists(path)
+        self._cookies_stat = (path, exists, now)
+        return exists
+
+
+    def _cache_info(self, url: str, info: dict):
+        with self._info_cache_lock:
+            self._info_cache[url] = (time.time() + _INFO_CACHE_TTL, info)
+
+    def _cached_info(self, url: str) -> Optional[dict]:
+        with self._info_cache_lock:
+            entry = self._info_cache.get(url)
+            if not entry:
+                return None
+            expiry, info = entry
+            if time.time() >= expiry:
+                del self._info_cache[url]
+                return None
+            return info
+
+    def _invalidate_info(self, url: str):
+        with self._info_cache_lock:
+            self._info_cache.pop(url, None)
+
+    def invalidate_ydl_pool(self):
+        """Drop pooled YoutubeDL instances after a settings change.
+
+        Cookie options are baked into an instance at construction, so
+        entries built under the old settings must not be reused. Instances
+        mid-call finish on their own lock; new callers rebuild.
+        """
+        with self._ydl_pool_lock:
+            self._ydl_pool.clear()
+
+    @contextmanager
+    def _get_ydl(self, opts: dict):
+        """Yield a pooled YoutubeDL for these options, serialized per instance.
+
+        Only used for metadata fetches, where the option dicts are a small
+        fixed set; download attempts carry per-job hooks and output templates
+        and still build their own instance.
+        """
+        key = repr(sorted(opts.items(), key=lambda kv: kv[0]))
+        with self._ydl_pool_lock:
+            entry = self._ydl_pool.get(key)
+            if entry is None:
+                entry = (yt_dlp.YoutubeDL(opts), threading.Lock())
+                self._ydl_pool[key] = entry
+        ydl, lock = entry
+        with lock:
+            yield ydl
+
+    def _preferred_clients(self, url: str, chain: List[str]) -> List[str]:
+        """Return the client chain with the host's last-good client first."""
+        host = urlparse(url).netloc
+        with self._good_client_lock:
+            entry = self._last_good_client.get(host)
+            if entry is None:
+                return chain
+            client, ts = entry
+            if time.time() - ts >= _GOOD_CLIENT_TTL:
+                del self._last_good_client[host]
+                return chain
+        if client in chain:
+            return [client] + [c for c in chain if c != client]
+        return chain
+
+    def _remember_good_client(self, url: str, client: str):
+        with self._good_client_lock:
+            self._last_good_client[urlparse(url).netloc] = (client, time.time())
+
+    def _forget_good_client(self, url: str):
+        with self._good_client_lock:
+            self._last_good_client.pop(urlparse(url).netloc, None)
+
+    @staticmethod
+    def _max_height(formats: list) -> int:
+        max_height = 0
+        for f in formats:
+            if f.get('height'):
+                max_height = max(max_height, f['height'])
+        return max_height
 
     def set_progress_callback(self, callback):
         self.progress_callback = callback
 
+    async def warm_player_js(self):
+        """Prime the yt-dlp cache so the first real request skips the
+        player-JS fetch and signature warmup. Fired once at startup;
+        failures (offline, blocked) are harmless."""
+        def _warm():
+            ydl_opts = {
+                'quiet': True,
+                'no_warnings': True,
+                'skip_download': True,
+                'cachedir': self._ytdlp_cachedir,
+            }
+            with self._get_ydl(ydl_opts) as ydl:
+                ydl.extract_info('https://www.youtube.com/watch?v=jNQXAC9IVRw', download=False)
+
+        try:
+            await asyncio.to_thread(_warm)
+            print("[STARTUP] yt-dlp player cache warmed")
+        except Exception as e:
+            print(f"[STARTUP] Player cache warmup skipped: {e}")
+
 
     async def fetch_live_metadata(self, url: str) -> dict:
         """Fetch live metadata for a URL without downloading."""
@@ -112,8 +475,9 @@ class DownloadManager:
                 'quiet': True,
                 'skip_download': True,
                 'no_warnings': True,
+                'cachedir': self._ytdlp_cachedir,
             }
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            with self._get_ydl(ydl_opts) as ydl:
                 return ydl.extract_info(url, download=False)
 
         try:
@@ -135,8 +499,9 @@ class DownloadManager:
                 'skip_download': True,
                 'extract_flat': 'in_playlist', # Fetch only playlist meta + 1st video
                 'playlistend': 1,
+                'cachedir': self._ytdlp_cachedir,
             }
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            with self._get_ydl(ydl_opts) as ydl:
                 info = ydl.extract_info(url, download=False)
                 return info
         
@@ -162,147 +527,154 @@ class DownloadManager:
             print(f'[ERROR] Failed to fetch channel info: {e}')
             return None
 
+    async def fetch_channel_metadata_many(self, urls: List[str], concurrency: int = 5) -> List[Optional[dict]]:
+        """Fetch metadata for many channels with bounded concurrency.
 
+        Results come back in input order; failed fetches are None, same as
+        the single-channel call. The pooled YoutubeDL instance is shared
+        across all fetches, so extractor and connection state is reused.
+        """
+        sem = asyncio.Semaphore(concurrency)
+
+        async def _one(url):
+            async with sem:
+                return await self.fetch_channel_metadata(url)
+
+        return await asyncio.gather(*[_one(url) for url in urls])
+
+
+
+    async def fetch_info(self, url: str) -> Optional[VideoInfo]:
+        """Fetch available formats for a URL off the event loop.
+
+        The blocking yt-dlp work runs on the dedicated fetch pool, and
+        concurrent calls for the same URL piggyback on one in-flight
+        extraction instead of each opening their own.
+        """
+        task = self._inflight_info.get(url)
+        if task is None:
+            loop = asyncio.get_running_loop()
+            task = loop.create_task(self._fetch_info_pooled(url))
+            self._inflight_info[url] = task
+            task.add_done_callback(lambda _: self._inflight_info.pop(url, None))
+        return await asyncio.shield(task)
 
-    def fetch_info(self, url: str) -> Optional[VideoInfo]:
+    async def _fetch_info_pooled(self, url: str) -> Optional[VideoInfo]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._fetch_pool, self._fetch_info_sync, url)
+
+    def _fetch_info_sync(self, url: str) -> Optional[VideoInfo]:
         try:
-            from app.core.config import config
             settings = config.get_settings()
             
             ydl_opts = {
-                'quiet': True,
-                'no_warnings': True,
-                'user_agent': 'Mozilla/5.0 (Linux; Android 10; K) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Mobile Safari/537.36',
-                'extractor_args': {'youtube': {'player_client': ['android_creator']}},
-                'ffmpeg_location': os.path.join(os.getcwd(), 'bin', 'ffmpeg.exe')
+                **_FETCH_BASE_OPTS,
+                'ffmpeg_location': self.ffmpeg_path,
+                'cachedir': self._ytdlp_cachedir,
             }
-            
-            # Explicitly check for ffmpeg binary to avoid confusion
-            import shutil
-            ffmpeg_path = os.path.join(os.getcwd(), 'bin', 'ffmpeg.exe')
-            if os.path.exists(ffmpeg_path):
-                ydl_opts['ffmpeg_location'] = ffmpeg_path
-            else:
-                # Fallback to system PATH
-                if shutil.which('ffmpeg'):
-                    ydl_opts['ffmpeg_location'] = shutil.which('ffmpeg')
 
             # if settings.cookies_path and os.path.exists(settings.cookies_path):
             #     ydl_opts['cookiefile'] = settings.cookies_path
             # elif settings.cookies_browser:
             #     ydl_opts['cookiesfrombrowser'] = (settings.cookies_browser,)
 
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            cached = self._cached_info(url)
+            if cached is not None:
+                return self._process_info(cached)
+
+            with self._get_ydl(ydl_opts) as ydl:
                 info = ydl.extract_info(url, download=False)
+            if info:
+                self._cache_info(url, info)
             
             # ... process info ...
             return self._process_info(info)
 
         except Exception as e:
             # Debug: print exact exception
-            print(f"[DEBUG] Exception caught: type={type(e).__name__}, message={str(e)}")
-            print(f"[DEBUG] 'cookie' in message: {'cookie' in str(e).lower()}")
-            print(f"[DEBUG] cookies_path={settings.cookies_path}, cookies_browser={settings.cookies_browser}")
+            if _DEBUG:
+                print(f"[DEBUG] Exception caught: type={type(e).__name__}, message={str(e)}")
+                print(f"[DEBUG] 'cookie' in message: {'cookie' in str(e).lower()}")
+                print(f"[DEBUG] cookies_path={settings.cookies_path}, cookies_browser={settings.cookies_browser}")
             
             # Fallback: Retry without cookies if cookies were used
             if (settings.cookies_path or settings.cookies_browser) and "cookie" in str(e).lower():
                  print(f"[WARNING] Cookie fetch failed ({e}). Retrying without cookies...")
-                 print(f"[DEBUG] cookies_path: {settings.cookies_path}, cookies_browser: {settings.cookies_browser}")
+                 if _DEBUG:
+                     print(f"[DEBUG] cookies_path: {settings.cookies_path}, cookies_browser: {settings.cookies_browser}")
                  try:
                      # Create fresh opts WITHOUT cookies
                      fallback_opts = {
                          'quiet': True,
                          'no_warnings': True,
                          'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                         'ffmpeg_location': ydl_opts.get('ffmpeg_location')
+                         'ffmpeg_location': self.ffmpeg_path,
+                         'cachedir': self._ytdlp_cachedir
                      }
-                     print(f"[DEBUG] Fallback opts: {fallback_opts}")
+                     if _DEBUG:
+                         print(f"[DEBUG] Fallback opts: {fallback_opts}")
                      
-                     with yt_dlp.YoutubeDL(fallback_opts) as ydl:
+                     with self._get_ydl(fallback_opts) as ydl:
                         info = ydl.extract_info(url, download=False)
-                     print("[DEBUG] Fallback succeeded!")
+                     if _DEBUG:
+                         print("[DEBUG] Fallback succeeded!")
                      return self._process_info(info)
                  except Exception as e2:
-                     import traceback
                      print(f"[ERROR] Fallback failed: {e2}")
                      print(f"[ERROR] Fallback traceback: {traceback.format_exc()}")
             
-            import traceback
             trace = traceback.format_exc()
             print(f"Error fetching info: {e}")
-            print(f"[DEBUG_TRACE] {trace}")
+            if _DEBUG:
+                print(f"[DEBUG_TRACE] {trace}")
             return None
 
     def _process_info(self, info):
-            # Collect all mp4 video formats
-            all_formats = []
-            
+            # Single pass over formats: keep the best candidate per resolution
+            # bucket as we go instead of building intermediate lists, grouping
+            # and sorting each group (YouTube returns 50+ formats per video).
+            best_per_res: Dict[str, tuple] = {}  # res_key -> (sort_key, format, size, has_audio)
+
             for f in info.get("formats", []):
                 # Show ALL formats with video. We no longer skip webm, because
                 # YouTube only provides 1440p and 4K in VP9/AV1 formats (often webm).
-                if f.get("vcodec") != "none":
-                    height = f.get("height")
-                    width = f.get("width")
-                    if not height or not width:
-                        continue
-                    
-                    long_edge = max(height, width)
-                    if long_edge >= 3840:
-                        res_key = "2160p"
-                    elif long_edge >= 2560:
-                        res_key = "1440p"
-                    elif long_edge >= 1920:
-                        res_key = "1080p"
-                    elif long_edge >= 1280:
-                        res_key = "720p"
-                    elif long_edge >= 854:
-                        res_key = "480p"
-                    elif long_edge >= 640:
-                        res_key = "360p"
-                    elif long_edge >= 426:
-                        res_key = "240p"
-                    else:
-                        res_key = "144p"
-                    size = f.get("filesize") or f.get("filesize_approx") or 0
-                    has_audio = f.get("acodec") != "none"
-                    
-                    all_formats.append({
-                        'format': f,
-                        'res_key': res_key,
-                        'size': size,
-                        'has_audio': has_audio
-                    })
-            
-            # Group by resolution and keep the best one
-            from collections import defaultdict
-            by_resolution = defaultdict(list)
-            for item in all_formats:
-                by_resolution[item['res_key']].append(item)
-            
-            # Keep best format per resolution
+                if f.get("vcodec") == "none":
+                    continue
+                height = f.get("height")
+                width = f.get("width")
+                if not height or not width:
+                    continue
+
+                long_edge = height if height >= width else width
+                for threshold, res_key in _RES_BUCKETS:
+                    if long_edge >= threshold:
+                        break
+
+                size = f.get("filesize") or f.get("filesize_approx") or 0
+                has_audio = f.get("acodec") != "none"
+
+                # Rank: 1) H.264 (avc1) for max compatibility, 2) mp4
+                # extension, 3) has audio, 4) filesize
+                sort_key = (
+                    1 if f.get('vcodec', '').startswith('avc') else 0,
+                    1 if f.get('ext') == 'mp4' else 0,
+                    has_audio,
+                    size,
+                )
+                current = best_per_res.get(res_key)
+                if current is None or sort_key > current[0]:
+                    best_per_res[res_key] = (sort_key, f, size, has_audio)
+
             formats = []
-            for res_key, items in by_resolution.items():
-                # Sort by: 1) H.264 codec (avc1) for max compatibility, 2) mp4 extension, 3) has audio, 4) filesize
-                best = sorted(
-                    items, 
-                    key=lambda x: (
-                        1 if x['format'].get('vcodec', '').startswith('avc') else 0,
-                        1 if x['format'].get('ext') == 'mp4' else 0,
-                        x['has_audio'], 
-                        x['size']
-                    ), 
-                    reverse=True
-                )[0]
-                f = best['format']
-                
-                size_str = f"{round(best['size']/(1024*1024),1)}MiB" if best['size'] else "Unknown"
-                
+            for res_key, (_, f, size, has_audio) in best_per_res.items():
+                size_str = f"{round(size/(1024*1024),1)}MiB" if size else "Unknown"
+
                 # CRITICAL INTERVENTION: If the best format for this resolution lacks audio (e.g. 1080p+ DASH streams),
                 # we MUST instruct yt-dlp to download the video track AND the best audio track and merge them.
                 final_format_id = f["format_id"]
-                if not best['has_audio']:
+                if not has_audio:
                     final_format_id = f"{f['format_id']}+bestaudio/best"
-                
+
                 formats.append(Format(
                     id=final_format_id,
                     ext=f["ext"],
@@ -310,8 +682,8 @@ class DownloadManager:
                     size=size_str,
                     note=f.get("format_note")
                 ))
-            
-            formats.sort(key=lambda x: int(x.res.replace('p', '')), reverse=True)
+
+            formats.sort(key=lambda x: _RES_ORDER[x.res], reverse=True)
 
             return VideoInfo(
                 title=info.get("title", "Unknown"),
@@ -335,8 +707,6 @@ class DownloadManager:
             except: pass
 
     def add_to_queue(self, url: str, format_id: str, title: str, user_id: str = None, thumbnail: str = "", status: str = "queued", sub_id: str = None) -> str:
-        from app.core.db import db
-        import time
         
         job_id = str(uuid.uuid4())
         job = DownloadJob(
@@ -354,9 +724,9 @@ class DownloadManager:
         db.add_job(job.dict())
         return job_id
 
-    def remove_job(self, job_id: str):
-        from app.core.db import db
-        print(f"[DEBUG] remove_job called for {job_id}")
+    async def remove_job(self, job_id: str):
+        if _DEBUG:
+            print(f"[DEBUG] remove_job called for {job_id}")
         
         job = self.jobs.get(job_id)
         filename = None
@@ -367,27 +737,30 @@ class DownloadManager:
                 self.cancel_job(job_id)
             del self.jobs[job_id]
         else:
-            all_jobs = db.get_all_jobs()
-            target = next((j for j in all_jobs if j['id'] == job_id), None)
+            target = db.get_job(job_id)
             if target:
                 filename = target.get('filename')
 
         if filename:
-            try:
-                if os.path.exists(filename):
-                     os.remove(filename)
-                
-                path_in_dir = os.path.join(self.download_dir, filename)
-                if os.path.exists(path_in_dir):
-                    os.remove(path_in_dir)
-            except Exception as e:
-                print(f"Error deleting file {filename}: {e}")
+            # The DB stores basenames, so anchor relative names in the
+            # download dir; EAFP remove skips the exists() stat, and the
+            # unlink stays off the event loop (slow on network mounts).
+            candidate = filename if os.path.isabs(filename) else os.path.join(self.download_dir, filename)
+
+            def _delete_file():
+                try:
+                    os.remove(candidate)
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    print(f"Error deleting file {candidate}: {e}")
+
+            await asyncio.to_thread(_delete_file)
 
         db.delete_job(job_id)
         return True
 
     def cancel_job(self, job_id: str):
-        from app.core.db import db
         
         # Kill process if active
         if job_id in self.processes:
@@ -406,40 +779,46 @@ class DownloadManager:
             return True
         return False
 
-    def open_folder(self, job_id: str = None):
-        # Default to opening the main downloads directory
-        path_to_open = self.download_dir
-        
-        if job_id and job_id in self.jobs:
-            job = self.jobs[job_id]
-            # Resolve full path
-            full_path = None
-            if job.filename:
-                if os.path.isabs(job.filename) and os.path.exists(job.filename):
-                    full_path = job.filename
-                elif os.path.exists(os.path.join(self.download_dir, job.filename)):
-                    full_path = os.path.join(self.download_dir, job.filename)
-            
-            # If we found the file, open its PARENT directory
-            if full_path:
-                path_to_open = os.path.dirname(full_path)
-                # If we want to highlight the file, explorer /select,path works on Windows
+    async def open_folder(self, job_id: str = None):
+        # Path probes and the file-manager subprocess block (the spawn waits
+        # for the opener to exit), so the whole body runs off the event loop
+        # like the remove_job delete.
+        def _open():
+            # Default to opening the main downloads directory
+            path_to_open = self.download_dir
+
+            if job_id and job_id in self.jobs:
+                job = self.jobs[job_id]
+                # Resolve full path
+                full_path = None
+                if job.filename:
+                    if os.path.isabs(job.filename) and os.path.exists(job.filename):
+                        full_path = job.filename
+                    elif os.path.exists(os.path.join(self.download_dir, job.filename)):
+                        full_path = os.path.join(self.download_dir, job.filename)
+
+                # If we found the file, open its PARENT directory
+                if full_path:
+                    path_to_open = os.path.dirname(full_path)
+                    # If we want to highlight the file, explorer /select,path works on Windows
+                    if os.name == 'nt':
+                        try:
+                            subprocess.run(['explorer', '/select,', full_path])
+                            return
+                        except:
+                            pass # Fallback to opening folder normally
+
+            try:
                 if os.name == 'nt':
-                    try:
-                        subprocess.run(['explorer', '/select,', full_path])
-                        return
-                    except:
-                        pass # Fallback to opening folder normally
+                    os.startfile(path_to_open)
+                elif sys.platform == 'darwin':
+                     subprocess.run(['open', path_to_open])
+                else:
+                     subprocess.run(['xdg-open', path_to_open])
+            except Exception as e:
+                print(f"Error opening folder: {e}")
 
-        try:
-            if os.name == 'nt':
-                os.startfile(path_to_open)
-            elif sys.platform == 'darwin':
-                 subprocess.run(['open', path_to_open])
-            else:
-                 subprocess.run(['xdg-open', path_to_open])
-        except Exception as e:
-            print(f"Error opening folder: {e}")
+        await asyncio.to_thread(_open)
 
     def get_queue(self, user_id: str = None) -> List[DownloadJob]:
         if user_id:
@@ -450,11 +829,9 @@ class DownloadManager:
         jobs.sort(key=lambda x: x.timestamp_start, reverse=True)
         return jobs
 
-    def reload_queue(self, user_id: str = None):
+    async def reload_queue(self, user_id: str = None):
         """Reload jobs from database to sync in-memory state"""
-        from app.core.db import db
         settings = config.get_settings()
-        downloads_dir = Path(settings.download_dir).resolve()
         
         # Get all jobs from DB
         db_jobs = db.get_all_jobs()
@@ -476,9 +853,11 @@ class DownloadManager:
         
         for job_id in jobs_to_remove:
             del self.jobs[job_id]
-            print(f"[RELOAD] Removed job {job_id} from memory")
+            if _DEBUG:
+                print(f"[RELOAD] Removed job {job_id} from memory")
             
-        # Update existing jobs in memory with new DB state + Hard Invariant
+        # Update existing jobs in memory with new DB state
+        updated = []
         for db_job in db_jobs:
             job_id = db_job['id']
             if job_id in self.jobs:
@@ -486,351 +865,398 @@ class DownloadManager:
                 job.is_in_library = db_job.get('is_in_library', 0)
                 job.is_in_downloads = db_job.get('is_in_downloads', 1)
                 job.filename = db_job.get('filename', job.filename)
-                
-                # 🔒 HARD RULE: NOT IN DOWNLOADS DIR == NOT A DOWNLOAD
-                try:
-                    if job.filename:
-                        file_path = Path(job.filename).resolve()
-                        if not file_path.is_relative_to(downloads_dir):
-                            job.is_in_downloads = 0
-                            print(f"[RELOAD] Hard Rule: Job {job_id} moved out of downloads, hiding.")
-                except Exception:
-                    # If path resolution fails (e.g. invalid chars), treat as not in downloads for safety
-                    pass
-                
-                print(f"[RELOAD] Updated job {job_id} state: lib={job.is_in_library}, dl={job.is_in_downloads}")
+                updated.append(job)
+
+        # 🔒 HARD RULE: NOT IN DOWNLOADS DIR == NOT A DOWNLOAD
+        # Path(...).resolve() chases symlinks on disk; resolve every job's
+        # path concurrently on worker threads so the checks overlap instead
+        # of stat'ing one file at a time (sequential stats dominate on
+        # network-mounted dirs with large queues).
+        def _resolve_one(filename, downloads_dir):
+            try:
+                return Path(filename).resolve().is_relative_to(downloads_dir)
+            except Exception:
+                # If path resolution fails (e.g. invalid chars), treat as not in downloads for safety
+                return False
+
+        to_check = [(job.id, job.filename) for job in updated if job.filename]
+        if to_check:
+            downloads_dir = Path(settings.download_dir).resolve()
+            results = await asyncio.gather(
+                *[asyncio.to_thread(_resolve_one, filename, downloads_dir)
+                  for _, filename in to_check]
+            )
+            in_downloads = {job_id: ok for (job_id, _), ok in zip(to_check, results)}
+            for job in updated:
+                if in_downloads.get(job.id, True) is False:
+                    job.is_in_downloads = 0
+                    print(f"[RELOAD] Hard Rule: Job {job.id} moved out of downloads, hiding.")
+
+        if _DEBUG:
+            for job in updated:
+                print(f"[RELOAD] Updated job {job.id} state: lib={job.is_in_library}, dl={job.is_in_downloads}")
 
     async def start_download(self, job_id: str):
-        print(f"[DEBUG] start_download (thread-based) called for {job_id}")
-        from app.core.db import db
+        """Queue a job for download on the worker pool."""
+        self._ensure_workers()
+        await self._job_queue.put(job_id)
+
+    def _ensure_workers(self):
+        loop = asyncio.get_running_loop()
+        if self._emitter_task is None or self._emitter_task.done():
+            self._emitter_task = loop.create_task(self._emitter_loop())
+        if self._workers and not all(w.done() for w in self._workers):
+            return
+        self._job_queue = asyncio.Queue()
+        self._workers = [
+            loop.create_task(self._worker()) for _ in range(self._max_workers)
+        ]
+
+    async def _emitter_loop(self):
+        """Send the latest snapshot of each dirty job every 100 ms."""
+        while True:
+            await asyncio.sleep(0.1)
+            if not self._dirty_jobs:
+                continue
+            dirty, self._dirty_jobs = self._dirty_jobs, set()
+            for job_id in dirty:
+                job = self.jobs.get(job_id)
+                if job is not None:
+                    await self._emit_progress(job)
+
+    async def _worker(self):
+        while True:
+            job_id = await self._job_queue.get()
+            try:
+                await self._run_one(job_id)
+            except Exception as e:
+                print(f"[WORKER] Unhandled error for {job_id}: {e}")
+            finally:
+                self._job_queue.task_done()
+
+    async def _run_one(self, job_id: str):
+        if _DEBUG:
+            print(f"[DEBUG] start_download (thread-based) called for {job_id}")
         
-        async with self.semaphore:
-            job = self.jobs.get(job_id)
-            if not job or job.status == DownloadStatus.CANCELED:
-                return
+        job = self.jobs.get(job_id)
+        if not job or job.status == DownloadStatus.CANCELED:
+            return
 
-            job.status = DownloadStatus.DOWNLOADING
-            db.update_job_status(job_id, "downloading")
-            
-            # Run download in thread pool to avoid blocking
-            loop = asyncio.get_event_loop()
-            
-            def download_with_ytdlp():
-                """Download using yt-dlp Python API"""
-                try:
-                    settings = config.get_settings()
-                    ffmpeg_dir = os.path.join(os.getcwd(), 'bin')
-                    
-                    # Progress hook for real-time updates
-                    # Progress hook for real-time updates
-                    def progress_hook(d):
-                        # print(f"[DEBUG_HOOK] Status: {d.get('status')}")
-                        if d['status'] == 'downloading':
-                            # Parse progress
-                            progress_updated = False
-                            if 'downloaded_bytes' in d and 'total_bytes' in d:
-                                try:
-                                    progress = (d['downloaded_bytes'] / d['total_bytes']) * 100
-                                    job.progress = round(progress, 1)
-                                    progress_updated = True
-                                except: pass
-                            elif '_percent_str' in d:
-                                try:
-                                    clean_str = strip_ansi_codes(d['_percent_str'])
-                                    percent_str = clean_str.strip().replace('%', '')
-                                    job.progress = float(percent_str)
-                                    progress_updated = True
-                                except: pass
-                            
-                            # Parse speed
-                            if 'speed' in d and d['speed']:
-                                try:
-                                    job.speed = f"{d['speed']/1024/1024:.1f}MiB/s"
-                                except: pass
-                            elif '_speed_str' in d:
-                                job.speed = strip_ansi_codes(d['_speed_str'].strip())
-                            
-                            # Parse ETA
-                            if 'eta' in d and d['eta']:
-                                try:
-                                    eta_sec = int(d['eta'])
-                                    # Format seconds to MM:SS
-                                    m, s = divmod(eta_sec, 60)
-                                    h, m = divmod(m, 60)
-                                    if h > 0:
-                                        job.eta = f"{h}:{m:02d}:{s:02d}"
-                                    else:
-                                        job.eta = f"{m:02d}:{s:02d}"
-                                except: 
-                                    job.eta = str(d['eta'])
-                            elif '_eta_str' in d:
-                                job.eta = strip_ansi_codes(d['_eta_str'].strip())
-                            
-                            # Log what we parsed
-                            # print(f"[DEBUG_HOOK] ID={job.id[:8]} Prog={job.progress} Speed={job.speed} ETA={job.eta}")
-                            
-                            # Update database periodically (every ~5%)
-                            if progress_updated and int(job.progress) % 5 == 0:
-                                db.update_job_status(job.id, "downloading", job.progress)
-                            
-                            # Emit progress update
+        job.status = DownloadStatus.DOWNLOADING
+        db.update_job_status(job_id, "downloading")
+        
+        # Run download in thread pool to avoid blocking
+        loop = asyncio.get_running_loop()
+        self._progress_writer.ensure_started(loop)
+        
+        def download_with_ytdlp():
+            """Download using yt-dlp Python API"""
+            try:
+                settings = config.get_settings()
+                
+                # Progress hook for real-time updates.
+                # yt-dlp fires this hundreds of times per second on fast
+                # links; gate the cross-thread emits and DB writes so each
+                # tick doesn't wake the event loop or hit SQLite.
+                hook_state = {'emit_ts': 0.0, 'emit_prog': -1.0}
+
+                def progress_hook(d):
+                    # print(f"[DEBUG_HOOK] Status: {d.get('status')}")
+                    if d['status'] == 'downloading':
+                        # Parse progress
+                        progress_updated = False
+                        if 'downloaded_bytes' in d and 'total_bytes' in d:
+                            try:
+                                progress = (d['downloaded_bytes'] / d['total_bytes']) * 100
+                                job.progress = round(progress, 1)
+                                progress_updated = True
+                            except: pass
+                        elif '_percent_str' in d:
+                            try:
+                                clean_str = strip_ansi_codes(d['_percent_str'])
+                                percent_str = clean_str.strip().replace('%', '')
+                                job.progress = float(percent_str)
+                                progress_updated = True
+                            except: pass
+                        
+                        # Parse speed
+                        if 'speed' in d and d['speed']:
+                            try:
+                                job.speed = f"{d['speed']/1024/1024:.1f}MiB/s"
+                            except: pass
+                        elif '_speed_str' in d:
+                            job.speed = strip_ansi_codes(d['_speed_str'].strip())
+                        
+                        # Parse ETA
+                        if 'eta' in d and d['eta']:
+                            try:
+                                eta_sec = int(d['eta'])
+                                # Format seconds to MM:SS
+                                m, s = divmod(eta_sec, 60)
+                                h, m = divmod(m, 60)
+                                if h > 0:
+                                    job.eta = f"{h}:{m:02d}:{s:02d}"
+                                else:
+                                    job.eta = f"{m:02d}:{s:02d}"
+                            except: 
+                                job.eta = str(d['eta'])
+                        elif '_eta_str' in d:
+                            job.eta = strip_ansi_codes(d['_eta_str'].strip())
+                        
+                        # Log what we parsed
+                        # print(f"[DEBUG_HOOK] ID={job.id[:8]} Prog={job.progress} Speed={job.speed} ETA={job.eta}")
+                        
+                        now = time.monotonic()
+
+                        # Emit when enough time has passed or progress
+                        # moved a visible amount; the DB write rides the
+                        # same gate since the batcher coalesces it anyway
+                        if (now - hook_state['emit_ts'] > 0.25
+                                or abs(job.progress - hook_state['emit_prog']) >= 1.0):
+                            hook_state['emit_ts'] = now
+                            hook_state['emit_prog'] = job.progress
+                            if progress_updated:
+                                self._progress_writer.submit_nowait(
+                                    job.id, "downloading", job.progress
+                                )
                             try:
-                                print(f"[PROGRESS_EMIT] {job.progress}% - {job.speed} - ETA: {job.eta}")
-                                asyncio.run_coroutine_threadsafe(
-                                    self._emit_progress(job),
-                                    loop
+                                # isEnabledFor guard skips the format args
+                                # entirely on production runs; with the
+                                # queue-backed handler an enabled record is
+                                # just a put_nowait from this thread
+                                if logger.isEnabledFor(logging.DEBUG):
+                                    logger.debug("[PROGRESS_EMIT] %s%% - %s - ETA: %s",
+                                                 job.progress, job.speed, job.eta)
+                                # Mark dirty; _emitter_loop sends the latest
+                                # snapshot — no coroutine or Task per line
+                                loop.call_soon_threadsafe(
+                                    self._dirty_jobs.add, job.id
                                 )
                             except Exception as e:
-                                print(f"[EMIT_ERROR] {e}")
-                        
-                        elif d['status'] == 'finished':
-                            job.progress = 100.0
-                            if 'filename' in d:
-                                job.filename = os.path.basename(d['filename'])
-                                print(f"[DOWNLOAD] Finished: {job.filename}")
-                    
-                    # Convert format_id to smart format selection for better YouTube compatibility
-                    format_spec = job.format_id
+                                logger.warning("[EMIT_ERROR] %s", e)
                     
-                    # Only override if format_id is missing or looks like "best" override needed (but here we trust user selection if specific)
-                    # If format_id is None or empty, default to best compatible
-                    if not format_spec:
-                          if 'youtube.com' in job.url or 'youtu.be' in job.url:
-                              format_spec = 'bestvideo[vcodec^=avc1]+bestaudio[ext=m4a]/bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best'
-                          else:
-                              format_spec = 'best'
+                    elif d['status'] == 'finished':
+                        job.progress = 100.0
+                        if 'filename' in d:
+                            job.filename = os.path.basename(d['filename'])
+                            logger.info("[DOWNLOAD] Finished: %s", job.filename)
+                        # Always surface completion immediately
+                        try:
+                            asyncio.run_coroutine_threadsafe(
+                                self._emit_progress(job),
+                                loop
+                            )
+                        except Exception as e:
+                            logger.warning("[EMIT_ERROR] %s", e)
+                
+                # Convert format_id to smart format selection for better YouTube compatibility
+                format_spec = job.format_id
+                
+                # Only override if format_id is missing or looks like "best" override needed (but here we trust user selection if specific)
+                # If format_id is None or empty, default to best compatible
+                if not format_spec:
+                      if 'youtube.com' in job.url or 'youtu.be' in job.url:
+                          format_spec = 'bestvideo[vcodec^=avc1]+bestaudio[ext=m4a]/bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best'
+                      else:
+                          format_spec = 'best'
+
+                
+                # Client Fallback Chain strategy, reordered so the client
+                # that last worked for this host goes first
+                CLIENT_CHAIN = self._preferred_clients(job.url, ['android_creator', 'android'])
+                last_error = None
+                info = None
+                download_success = False
 
+                for client in CLIENT_CHAIN:
+                    print(f"[DOWNLOAD] Attempting with client: {client}")
                     
-                    # Client Fallback Chain strategy
-                    CLIENT_CHAIN = ['android_creator', 'android']
-                    last_error = None
-                    info = None
-                    download_success = False
-
-                    import shutil
-                    ffmpeg_path = os.path.join(os.getcwd(), 'bin', 'ffmpeg.exe')
-                    if not os.path.exists(ffmpeg_path):
-                        ffmpeg_path = shutil.which('ffmpeg')
-
-                    # Base options common to all attempts
-                    base_opts = {
+                    # One overlay per attempt on top of the frozen base
+                    current_opts = {
+                        **_DOWNLOAD_BASE_OPTS,
                         'format': format_spec if format_spec else 'bestvideo+bestaudio/best',
                         'outtmpl': os.path.join(self.download_dir, '%(title)s.%(ext)s'),
                         'progress_hooks': [progress_hook],
-                        'ffmpeg_location': ffmpeg_path,
-                        'quiet': False,
-                        'no_warnings': False,
-                        'merge_output_format': 'mp4',
-                        'force_ipv4': True,
-                        'socket_timeout': 15,
-                        'verbose': True
+                        'ffmpeg_location': self.ffmpeg_path,
+                        'cachedir': self._ytdlp_cachedir,
+                        'extractor_args': {'youtube': {'player_client': [client]}},
                     }
 
-                    for client in CLIENT_CHAIN:
-                        print(f"[DOWNLOAD] Attempting with client: {client}")
-                        
-                        # Clone opts and set client
-                        current_opts = base_opts.copy()
-                        current_opts['extractor_args'] = {'youtube': {'player_client': [client]}}
-                        # Add user agent for android clients
-                        current_opts['user_agent'] = 'Mozilla/5.0 (Linux; Android 10; K) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Mobile Safari/537.36'
-
-                        try:
-                            # 1. Metadata Check (Dry Run)
-                            with yt_dlp.YoutubeDL(current_opts) as ydl:
-                                meta = ydl.extract_info(job.url, download=False)
-                            
-                            if not meta:
-                                raise ValueError("No metadata returned")
-
-                            # 2. Resolution Guard (> 720p)
-                            # Check 'height' from video format. 
-                            # Note: meta might differ from final selected format, but gives good indication.
-                            # Better: Check if *selected* format meets criteria? 
-                            # The user requirement is: "If the resulting video is below 720p"
-                            # We can trust 'best' selection, but if 'best' is 360p, we fail.
-                            
-                            # Find max height available
-                            formats = meta.get('formats', [])
-                            max_height = 0
-                            for f in formats:
-                                if f.get('height'):
-                                    max_height = max(max_height, f['height'])
-                            
-                            print(f"[DOWNLOAD] Max resolution available: {max_height}p")
-                            
+                    try:
+                        # 1. Resolution Pre-Check (> 720p) — only when the
+                        # preview metadata is still cached; costs nothing
+                        # and avoids a download we'd throw away.
+                        meta = self._cached_info(job.url)
+                        if meta is not None:
+                            max_height = self._max_height(meta.get('formats', []))
+                            print(f"[DOWNLOAD] Max resolution available (cached): {max_height}p")
                             if max_height < 720:
                                 raise ValueError(f"Resolution too low ({max_height}p < 720p). Strictly enforcing HD.")
 
-                            # 3. Actual Download
-                            print(f"[DOWNLOAD] Quality check passed. Starting download...")
-                            with yt_dlp.YoutubeDL(current_opts) as ydl:
-                                info = ydl.extract_info(job.url, download=True)
-                            
-                            download_success = True
-                            print(f"[DOWNLOAD] Success with client: {client}")
-                            break
+                        # 2. Single-Pass Download
+                        # One extract_info(download=True) per attempt; the
+                        # .info.json sidecar replaces the old dry-run probe.
+                        with yt_dlp.YoutubeDL(current_opts) as ydl:
+                            info = ydl.extract_info(job.url, download=True)
+                        
+                        if not info:
+                            raise ValueError("No metadata returned")
 
-                        except Exception as e:
-                            print(f"[WARNING] Client {client} failed: {e}")
-                            last_error = e
-                            continue
-                    
-                    if not download_success:
-                        print(f"[ERROR] All clients failed. Last error: {last_error}")
-                        raise RuntimeError(f"Download failed for all clients (Low Res or Error). Last error: {last_error}")
-
-                    # Get successful filename
-                    if 'requested_downloads' in info and info['requested_downloads']:
-                        filepath = info['requested_downloads'][0]['filepath']
-                        job.filename = os.path.basename(filepath)
-                    elif '_filename' in info:
-                        job.filename = os.path.basename(info['_filename'])
-                    
-                    # Success
-                    job.status = DownloadStatus.COMPLETED
-                    job.progress = 100.0
-                    db.update_job_status(job.id, "completed", 100.0, filename=job.filename)
-                    
-                    # Save metadata
-                    db.update_job_metadata(
-                        job.id, 
-                        view_count=0, # Initialize to 0 for local tracking
-                        description=info.get('description'),
-                        duration=info.get('duration_string'),
-                        upload_date=info.get('upload_date')
-                    )
-                    
-                    print(f"[DOWNLOAD] Completed: {job.filename}")
-                    
-                except Exception as e:
-                    import traceback
+                        # 3. Resolution Guard (post-hoc)
+                        # Read the sidecar written alongside the download;
+                        # if the source tops out below 720p, drop the file
+                        # and fall through to the next client.
+                        formats = info.get('formats') or []
+                        infojson_path = None
+                        if info.get('requested_downloads'):
+                            infojson_path = info['requested_downloads'][0].get('infojson_filename')
+                        if infojson_path and os.path.exists(infojson_path):
+                            try:
+                                formats = _json_loads_file(infojson_path).get('formats') or formats
+                            finally:
+                                os.remove(infojson_path)
+                        
+                        max_height = self._max_height(formats)
+                        print(f"[DOWNLOAD] Max resolution available: {max_height}p")
+                        
+                        if max_height < 720:
+                            if info.get('requested_downloads'):
+                                filepath = info['requested_downloads'][0].get('filepath')
+                                if filepath and os.path.exists(filepath):
+                                    os.remove(filepath)
+                            raise ValueError(f"Resolution too low ({max_height}p < 720p). Strictly enforcing HD.")
+
+                        download_success = True
+                        self._remember_good_client(job.url, client)
+                        print(f"[DOWNLOAD] Success with client: {client}")
+                        break
+
+                    except Exception as e:
+                        print(f"[WARNING] Client {client} failed: {e}")
+                        # Cached stream URLs may have gone stale mid-window
+                        err = str(e).lower()
+                        if "expired" in err or "403" in err:
+                            self._invalidate_info(job.url)
+                        last_error = e
+                        continue
+                
+                if not download_success:
+                    self._forget_good_client(job.url)
+                    print(f"[ERROR] All clients failed. Last error: {last_error}")
+                    raise RuntimeError(f"Download failed for all clients (Low Res or Error). Last error: {last_error}")
+
+                # Get successful filename
+                if 'requested_downloads' in info and info['requested_downloads']:
+                    filepath = info['requested_downloads'][0]['filepath']
+                    job.filename = os.path.basename(filepath)
+                elif '_filename' in info:
+                    job.filename = os.path.basename(info['_filename'])
+                
+                # Success
+                job.status = DownloadStatus.COMPLETED
+                job.progress = 100.0
+                db.update_job_status(job.id, "completed", 100.0, filename=job.filename)
+                
+                # Save metadata
+                db.update_job_metadata(
+                    job.id, 
+                    view_count=0, # Initialize to 0 for local tracking
+                    description=info.get('description'),
+                    duration=info.get('duration_string'),
+                    upload_date=info.get('upload_date')
+                )
+                
+                print(f"[DOWNLOAD] Completed: {job.filename}")
+                
+            except Exception as e:
+                # format_exc walks and renders every frame — skip it unless
+                # someone is actually going to read the trace
+                if _DEBUG:
                     trace = traceback.format_exc()
-                    
-                    # Create user-friendly error message
-                    error_str = str(e)
-                    if 'empty' in error_str.lower():
-                        if 'youtube.com' in job.url or 'youtu.be' in job.url:
-                            error_msg = "YouTube download failed. Please configure cookies in Settings (Cookies File Path or Browser Cookies)."
-                        else:
-                            error_msg = "Download failed: The file is empty. The video may be restricted or unavailable."
-                    elif 'cookie' in error_str.lower():
-                        error_msg = "Authentication required. Please configure cookies in Settings."
+                
+                # Create user-friendly error message
+                error_str = str(e)
+                error_low = error_str.lower()
+                if 'empty' in error_low:
+                    if 'youtube.com' in job.url or 'youtu.be' in job.url:
+                        error_msg = "YouTube download failed. Please configure cookies in Settings (Cookies File Path or Browser Cookies)."
                     else:
-                        # Show just the error message, not the full traceback
-                        error_msg = f"Download failed: {str(e).split('ERROR:')[-1].strip() if 'ERROR:' in str(e) else str(e)}"
-                    
-                    print(f"[ERROR] {error_msg}")
+                        error_msg = "Download failed: The file is empty. The video may be restricted or unavailable."
+                elif 'cookie' in error_low:
+                    error_msg = "Authentication required. Please configure cookies in Settings."
+                else:
+                    # Show just the error message, not the full traceback.
+                    # rpartition gives the text after the last 'ERROR:' (or ''
+                    # when absent) without building a list of splits.
+                    error_msg = f"Download failed: {error_str.rpartition('ERROR:')[2].strip() or error_str}"
+                
+                print(f"[ERROR] {error_msg}")
+                if _DEBUG:
                     print(f"[DEBUG TRACE] {trace}")  # Still log full trace for debugging
-                    
-                    if job.status != DownloadStatus.CANCELED:
-                        job.status = DownloadStatus.ERROR
-                        job.error = error_msg
-                        db.update_job_status(job.id, "error", 0.0, error_msg=error_msg)
                 
-                # Final progress update
-                asyncio.run_coroutine_threadsafe(
-                    self._emit_progress(job),
-                    loop
-                )
+                if job.status != DownloadStatus.CANCELED:
+                    job.status = DownloadStatus.ERROR
+                    job.error = error_msg
+                    db.update_job_status(job.id, "error", 0.0, error_msg=error_msg)
             
-            # Run in thread pool
-            try:
-                await loop.run_in_executor(None, download_with_ytdlp)
-            except Exception as e:
-                import traceback
-                trace = traceback.format_exc()
-                error_msg = f"Thread Error: {str(e)}\n{trace}"
-                print(f"[CRITICAL ERROR] {error_msg}")
-                job.status = DownloadStatus.ERROR
-                job.error = error_msg
-                db.update_job_status(job.id, "error", 0.0, error_msg=error_msg)
-                await self._emit_progress(job)
-
-
-    def _parse_progress(self, job, line):
-        # [download]  23.4% of 100.0MiB at  2.5MiB/s ETA 00:35
-        print(f"[_parse_progress] Called with line: {line}")
-        
-        # Regex for percentage
-        percent_match = re.search(r'(\d+\.\d+)%', line)
-        if percent_match:
-            try:
-                 job.progress = float(percent_match.group(1))
-                 print(f"[_parse_progress] Set progress to {job.progress}%")
-            except: pass
+            # Final progress update
+            asyncio.run_coroutine_threadsafe(
+                self._emit_progress(job),
+                loop
+            )
         
-        # Regex for Speed
-        speed_match = re.search(r'at\s+([\w\.]+/s)', line)
-        if speed_match:
-            job.speed = strip_ansi_codes(speed_match.group(1))
-            print(f"[_parse_progress] Set speed to {job.speed}")
-            
-        # Regex for ETA
-        eta_match = re.search(r'ETA\s+([\d:]+)', line)
-        if eta_match:
-            job.eta = strip_ansi_codes(eta_match.group(1))
-            print(f"[_parse_progress] Set ETA to {job.eta}")
-            
-        # Emit (run in background so we don't block reading stdout)
-        print(f"[_parse_progress] Creating emit task for job {job.id[:8]}")
-        asyncio.create_task(self._emit_progress(job))
+        # Run in thread pool
+        try:
+            await loop.run_in_executor(self._download_pool, download_with_ytdlp)
+        except Exception as e:
+            error_msg = f"Thread Error: {str(e)}"
+            print(f"[CRITICAL ERROR] {error_msg}")
+            if _DEBUG:
+                print(traceback.format_exc())
+            job.status = DownloadStatus.ERROR
+            job.error = error_msg
+            db.update_job_status(job.id, "error", 0.0, error_msg=error_msg)
+            await self._emit_progress(job)
 
-    async def _emit_progress(self, job):
-        if self.progress_callback:
-            data = {
-                "type": "progress", 
-                "job_id": job.id, 
-                "status": job.status,
-                "progress": job.progress, 
-                "speed": job.speed, 
-                "eta": job.eta,
-                "filename": job.filename, 
-                "title": job.title
-            }
-            await self.progress_callback(data)
 
-    def update_ytdlp(self):
-        import subprocess
-        import importlib.metadata
-        
-        current_version = "Unknown"
-        try:
-            current_version = importlib.metadata.version('yt-dlp')
-        except:
-            pass
+    async def update_ytdlp(self):
+        # pip upgrades run for seconds to minutes; an async subprocess keeps
+        # the event loop serving requests instead of pinning a worker thread.
+        global _YTDLP_VERSION
+        current_version = _YTDLP_VERSION
 
         try:
-            cmd = [sys.executable, "-m", "pip", "install", "-U", "yt-dlp"]
-            process = subprocess.run(
-                cmd,
-                check=True,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True
+            proc = await asyncio.create_subprocess_exec(
+                sys.executable, "-m", "pip", "install", "-U", "yt-dlp",
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
             )
+            stdout_b, stderr_b = await proc.communicate()
+            stdout = stdout_b.decode(errors="replace")
+            if proc.returncode != 0:
+                return {
+                    "status": "error",
+                    "output": stderr_b.decode(errors="replace"),
+                    "current_version": current_version
+                }
             
-            # Get new version
+            # pip names the installed version on success; parsing it avoids
+            # re-scanning site-packages metadata. Already up to date -> no
+            # such line, version unchanged.
             new_version = current_version
-            try:
-                # Reload metadata or re-check
-                importlib.reload(importlib.metadata)
-                new_version = importlib.metadata.version('yt-dlp')
-            except:
-                pass
+            m = _PIP_INSTALLED_RE.search(stdout)
+            if m:
+                new_version = m.group(1)
+            elif "Successfully installed" in stdout:
+                new_version = _ytdlp_version()
+            _YTDLP_VERSION = new_version
                 
             return {
                 "status": "success", 
-                "output": process.stdout,
+                "output": stdout,
                 "current_version": current_version,
                 "new_version": new_version
             }
-        except subprocess.CalledProcessError as e:
-            return {
-                "status": "error", 
-                "output": e.stderr,
-                "current_version": current_version
-            }
         except Exception as e:
             return {
                 "status": "error", 
@@ -843,38 +1269,29 @@ class DownloadManager:
         Extract a direct stream URL for any video URL.
         """
         def _fetch():
-            current_dir = os.getcwd()
-            yt_dlp_exe = os.path.join(current_dir, 'yt-dlp', 'yt-dlp.exe')
-            
-            cmd = [
-                yt_dlp_exe,
-                "-g",
-                "--no-warnings",
-                "-f", "bv*[ext=mp4]+ba[ext=m4a]/b[ext=mp4]/best",
-                url
-            ]
-            
+            ydl_opts = {
+                **_STREAM_BASE_OPTS,
+                'cachedir': self._ytdlp_cachedir,
+            }
+
             # Add cookies if configured
-            from app.core.config import config
             settings = config.get_settings()
-            if settings.cookies_path and os.path.exists(settings.cookies_path):
-                cmd.extend(["--cookies", settings.cookies_path])
+            if settings.cookies_path and self._cookies_file(settings.cookies_path):
+                ydl_opts['cookiefile'] = settings.cookies_path
             elif settings.cookies_browser:
-                cmd.extend(["--cookies-from-browser", settings.cookies_browser])
-            
-            import subprocess
+                ydl_opts['cookiesfrombrowser'] = (settings.cookies_browser,)
+
             try:
-                # Use startupinfo to hide console window on Windows
-                startupinfo = None
-                if os.name == 'nt':
-                    startupinfo = subprocess.STARTUPINFO()
-                    startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-                
-                result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, encoding='utf-8', startupinfo=startupinfo)
-                if result.returncode == 0:
-                    return result.stdout.strip().split('\n')[0]
-                else:
+                with self._get_ydl(ydl_opts) as ydl:
+                    info = ydl.extract_info(url, download=False)
+                if not info:
                     return None
+                if info.get('url'):
+                    return info['url']
+                for f in info.get('requested_formats') or []:
+                    if f.get('url'):
+                        return f['url']
+                return None
             except Exception as e:
                 print(f"[STREAM ERROR] {e}")
                 return None
@@ -1,42 +1,66 @@
+import atexit
 import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
 import asyncio
 from app.core.db import db
 
+_configured = False
+
+class _NoDBFilter(logging.Filter):
+    """Drop app.core.db records before they reach the DB handler.
+
+    Filters run before Handler.handle calls emit, so circular DB logs are
+    rejected before paying for format() (whose %(asctime)s is a strftime
+    per record).
+    """
+
+    def filter(self, record):
+        return "app.core.db" not in record.name
+
+
 class DBLogHandler(logging.Handler):
+    def __init__(self, level=logging.NOTSET):
+        super().__init__(level)
+        self.addFilter(_NoDBFilter())
+
     def emit(self, record):
         try:
             msg = self.format(record)
-            level = record.levelname
-            source = record.name
-            
-            # Avoid logging logging errors or circular DB logs
-            if "app.core.db" in source:
-                return
-                
-            # We want to run db.add_log but we are likely in a synchronous call stack
-            # db methods are synchronous (sqlite), so it's fine.
-            # But we should be careful about performance. 
-            # Ideally logs should be batched or put in a queue. 
-            # For this simple app, direct insert is acceptable.
-            
-            db.add_log(level, msg, source)
+            # add_log only enqueues: a background thread in db.py batches
+            # queued records into one transaction per flush window, so this
+            # stays cheap on the emitting thread and fsyncs are amortized.
+            db.add_log(record.levelname, msg, record.name)
         except Exception:
             self.handleError(record)
 
 def setup_logging():
+    global _configured
+    if _configured:
+        return
+    _configured = True
+
     # Get root logger of 'app'
     logger = logging.getLogger("app")
     logger.setLevel(logging.INFO)
-    
-    # Check if handler already added
-    for h in logger.handlers:
-        if isinstance(h, DBLogHandler):
-            return
-            
+
     db_handler = DBLogHandler()
     formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
     db_handler.setFormatter(formatter)
-    logger.addHandler(db_handler)
+
+    console = logging.StreamHandler()
+    console.setFormatter(formatter)
+
+    # Both handlers sit behind one queue: the emitting thread only does a
+    # put_nowait, and a single listener thread owns the stdout lock and the
+    # DB handler's format + enqueue work.
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, console, db_handler,
+                             respect_handler_level=True)
+    listener.daemon = True
+    listener.start()
+    atexit.register(listener.stop)
+    logger.addHandler(QueueHandler(log_queue))
     
     # Also attach to uvicorn if we want server logs?
     # uvicorn logs are 'uvicorn.error' and 'uvicorn.access'
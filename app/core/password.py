@@ -11,13 +11,24 @@ Design principles (NIST SP 800-63B aligned):
   top names, English words, and common patterns — no separate list needed
 - Raw passwords are NEVER logged
 """
+import hashlib
 import logging
+import threading
+from collections import OrderedDict
 from typing import Optional
 
 import zxcvbn as _zxcvbn
 
 logger = logging.getLogger("app.password")
 
+# Strength reports are deterministic in (password, username) and UIs request
+# one per keystroke, so identical candidates (paste, backspace/retype) are
+# common. Bounded LRU keyed by a SHA-256 of the pair — never the raw
+# password — per the no-logging invariant above.
+_REPORT_CACHE: "OrderedDict[bytes, dict]" = OrderedDict()
+_REPORT_CACHE_LOCK = threading.Lock()
+_REPORT_CACHE_MAX = 128
+
 MIN_LENGTH = 14
 MAX_LENGTH = 128
 # zxcvbn scores: 0=very weak, 1=weak, 2=fair, 3=strong, 4=very strong
@@ -44,8 +55,11 @@ def validate_password(password: str, username: Optional[str] = None) -> None:
         raise ValueError(f"Password must not exceed {MAX_LENGTH} characters.")
 
     # ── Username containment check (case-insensitive) ────────────────────────
-    if username and username.lower() in password.lower():
-        raise ValueError("Password must not contain your username.")
+    # Lower-case each string once; a username longer than the password can
+    # never be contained, so skip both lowerings in that case.
+    if username and len(username) <= len(password):
+        if username.lower() in password.lower():
+            raise ValueError("Password must not contain your username.")
 
     # ── zxcvbn strength estimation ───────────────────────────────────────────
     # Pass username as a user-defined input so zxcvbn penalises passwords
@@ -73,10 +87,27 @@ def strength_report(password: str, username: Optional[str] = None) -> dict:
     Return a sanitised strength report suitable for sending to the client.
     The raw password is NOT included in the return value.
     """
+    # zxcvbn's dictionary walk is the dominant cost here (tens of ms); a
+    # few characters can never score, so answer those without running it.
+    if len(password) < 4:
+        return {
+            "score": 0,
+            "warning": "Too short",
+            "suggestions": ["Use a longer passphrase."],
+            "crack_time_display": "instant",
+        }
+
+    key = hashlib.sha256(f"{username or ''}\x00{password}".encode()).digest()
+    with _REPORT_CACHE_LOCK:
+        cached = _REPORT_CACHE.get(key)
+        if cached is not None:
+            _REPORT_CACHE.move_to_end(key)
+            return dict(cached)
+
     user_inputs = [username] if username else []
     result = _zxcvbn.zxcvbn(password, user_inputs=user_inputs)
     feedback = result.get("feedback", {})
-    return {
+    report = {
         "score": result["score"],          # 0–4
         "warning": feedback.get("warning", ""),
         "suggestions": feedback.get("suggestions", []),
@@ -84,3 +115,8 @@ def strength_report(password: str, username: Optional[str] = None) -> dict:
             "offline_slow_hashing_1e4_per_second", "unknown"
         ),
     }
+    with _REPORT_CACHE_LOCK:
+        _REPORT_CACHE[key] = report
+        if len(_REPORT_CACHE) > _REPORT_CACHE_MAX:
+            _REPORT_CACHE.popitem(last=False)
+    return dict(report)
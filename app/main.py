@@ -1,12 +1,14 @@
 import os
-import json
+import functools
 import asyncio
+import orjson
 import logging
 import mimetypes
 import re
 import shutil
 import time
 import uuid
+from collections import deque
 from datetime import timedelta
 from pathlib import Path
 from typing import List, Optional
@@ -23,7 +25,7 @@ from fastapi import (
     WebSocketDisconnect,
     status,
 )
-from fastapi.responses import FileResponse, HTMLResponse, JSONResponse, RedirectResponse
+from fastapi.responses import FileResponse, HTMLResponse, ORJSONResponse, RedirectResponse
 from fastapi.security import OAuth2PasswordRequestForm
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
@@ -32,10 +34,10 @@ from pydantic import BaseModel, validator
 from app.core.auth import (
     ACCESS_TOKEN_EXPIRE_MINUTES,
     Token,
+    aauthenticate_user,
+    aget_password_hash,
     create_access_token,
     get_current_user,
-    get_password_hash,
-    verify_password,
     validate_password,
     strength_report,
 )
@@ -53,8 +55,12 @@ COOKIE_SECURE = os.environ.get("COOKIE_SECURE", "false").lower() == "true"
 
 UPLOAD_DIR = Path(os.environ.get("UPLOAD_DIR", "uploads"))
 CONVERT_DIR = Path(os.environ.get("CONVERT_DIR", "converted"))
+MAX_UPLOAD_BYTES = int(os.environ.get("MAX_UPLOAD_MB", "2048")) * 1024 * 1024
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 CONVERT_DIR.mkdir(parents=True, exist_ok=True)
+# Resolved once so per-request traversal checks are a string compare, not
+# a second resolve()
+CONVERT_DIR_RESOLVED = CONVERT_DIR.resolve()
 
 # ---------------------------------------------------------------------------
 # FastAPI application – docs only exposed in DEBUG mode
@@ -65,23 +71,23 @@ app = FastAPI(
     docs_url="/docs" if DEBUG else None,
     redoc_url="/redoc" if DEBUG else None,
     openapi_url="/openapi.json" if DEBUG else None,
+    # orjson renders every JSON body in one C pass instead of the stdlib
+    # encoder's per-object Python walk
+    default_response_class=ORJSONResponse,
 )
 
 # ---------------------------------------------------------------------------
 # Security headers middleware
 # ---------------------------------------------------------------------------
-@app.middleware("http")
-async def add_security_headers(request: Request, call_next):
-    response = await call_next(request)
-    response.headers["X-Content-Type-Options"] = "nosniff"
-    response.headers["X-Frame-Options"] = "DENY"
-    response.headers["X-XSS-Protection"] = "1; mode=block"
-    response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
-    response.headers["Permissions-Policy"] = "geolocation=(), microphone=(), camera=()"
-    # HSTS: only send when running over HTTPS (COOKIE_SECURE is a proxy for that)
-    if COOKIE_SECURE:
-        response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
-    response.headers["Content-Security-Policy"] = (
+# Built once at import as raw header bytes; the middleware only appends them
+# to the response-start message.
+_SECURITY_HEADERS: list = [
+    (b"x-content-type-options", b"nosniff"),
+    (b"x-frame-options", b"DENY"),
+    (b"x-xss-protection", b"1; mode=block"),
+    (b"referrer-policy", b"strict-origin-when-cross-origin"),
+    (b"permissions-policy", b"geolocation=(), microphone=(), camera=()"),
+    (b"content-security-policy", (
         "default-src 'self'; "
         "script-src 'self' 'unsafe-inline' https://cdn.plyr.io https://cdn.jsdelivr.net; "
         "style-src 'self' 'unsafe-inline' https://fonts.googleapis.com https://cdn.plyr.io; "
@@ -90,23 +96,202 @@ async def add_security_headers(request: Request, call_next):
         "media-src 'self' blob:; "
         "connect-src 'self' ws: wss:; "
         "frame-src 'self' https://www.youtube.com https://youtube.com;"
+    ).encode()),
+]
+# HSTS: only send when running over HTTPS (COOKIE_SECURE is a proxy for that)
+if COOKIE_SECURE:
+    _SECURITY_HEADERS.append(
+        (b"strict-transport-security", b"max-age=31536000; includeSubDomains")
     )
-    return response
+
+
+class CoreMiddleware:
+    """Single pure-ASGI wrapper for the cross-cutting response concerns.
+
+    BaseHTTPMiddleware (what @app.middleware('http') wraps handlers in)
+    proxies every response body through a task pair and a memory channel,
+    and each stacked middleware adds its own send wrapper per request — so
+    the security headers, request id and timing all live in this one layer:
+    one closure, one list concat, one send call.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        # Static assets are same-origin, cacheable and fetched in bulk per
+        # page view; health probes fire every few seconds. Neither needs
+        # ~400 bytes of CSP re-sent, so skip them entirely.
+        if scope["type"] != "http" or scope["path"].startswith("/static/") \
+                or scope["path"] == "/health":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        request_id = uuid.uuid4().hex
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                elapsed_ms = (time.perf_counter() - start) * 1000.0
+                message["headers"] = list(message.get("headers") or []) + _SECURITY_HEADERS + [
+                    (b"x-request-id", request_id.encode("ascii")),
+                    (b"x-response-time", f"{elapsed_ms:.1f}ms".encode("ascii")),
+                ]
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+
+app.add_middleware(CoreMiddleware)
 
 # ---------------------------------------------------------------------------
 # Allowed video conversion formats (allowlist)
 # ---------------------------------------------------------------------------
-ALLOWED_CONVERT_FORMATS = {"mp4", "mkv", "webm", "mp3", "m4a", "avi", "mov"}
+ALLOWED_CONVERT_FORMATS = frozenset({"mp4", "mkv", "webm", "mp3", "m4a", "avi", "mov"})
+# Error text is static; build it once instead of sorting the set per failure
+_ALLOWED_CONVERT_HINT = ", ".join(sorted(ALLOWED_CONVERT_FORMATS))
 
 # ---------------------------------------------------------------------------
 # Simple in-memory rate limiter  {ip: [timestamp, ...]}
 # ---------------------------------------------------------------------------
+# {ip: deque of recent attempt timestamps}. deque(maxlen=5) keeps each entry
+# bounded; expired timestamps are popped from the left in O(1) instead of
+# rebuilding a list per attempt.
 login_attempts: dict = {}
+_LOGIN_WINDOW = 60.0  # seconds
+_LOGIN_MAX_ATTEMPTS = 5
+_ATTEMPTS_SWEEP_INTERVAL = 600.0
+_attempts_last_sweep = 0.0
+
+# Concurrent ffmpeg processes each bring their own thread pool; more than a
+# couple at once just fight for cores and slow every job down, so conversions
+# drain through a fixed pool of worker tasks (same shape as the download
+# workers in DownloadManager)
+_FFMPEG_CONCURRENCY = int(
+    os.environ.get("MAX_CONCURRENT_CONVERSIONS", str(max(1, (os.cpu_count() or 2) // 2)))
+)
+# Pin each ffmpeg's threads so N concurrent jobs split the cores instead of
+# each defaulting to -threads auto (= every logical CPU) — without this the
+# worker count bounds process count but not actual CPU pressure
+_FFMPEG_THREADS = max(1, (os.cpu_count() or 2) // _FFMPEG_CONCURRENCY)
+
+_conversion_queue: Optional[asyncio.Queue] = None
+_conversion_workers: list = []
+
+# Progress percentages pool here and a single flusher task writes them to
+# SQLite in one transaction per wakeup, so N concurrent encodes cost one
+# WAL commit per flush window instead of one per progress line. Status
+# transitions still write synchronously for durability.
+_progress_buffer: dict = {}
+_progress_flusher: Optional[asyncio.Task] = None
+_PROGRESS_FLUSH_INTERVAL = 0.5
+
+
+def _ensure_conversion_workers():
+    global _conversion_queue, _progress_flusher
+    if _conversion_workers and not all(w.done() for w in _conversion_workers):
+        return
+    loop = asyncio.get_running_loop()
+    _conversion_queue = asyncio.Queue()
+    _conversion_workers[:] = [
+        loop.create_task(_conversion_worker()) for _ in range(_FFMPEG_CONCURRENCY)
+    ]
+    if _progress_flusher is None or _progress_flusher.done():
+        _progress_flusher = loop.create_task(_progress_flush_loop())
+
+
+async def _progress_flush_loop():
+    while True:
+        await asyncio.sleep(_PROGRESS_FLUSH_INTERVAL)
+        if not _progress_buffer:
+            continue
+        batch = dict(_progress_buffer)
+        _progress_buffer.clear()
+        try:
+            db.update_conversion_progress_batch(batch)
+        except Exception:
+            logger.exception("Conversion progress flush failed")
+
+
+async def _conversion_worker():
+    while True:
+        job_id, input_filename, target_format = await _conversion_queue.get()
+        try:
+            await _run_conversion(job_id, input_filename, target_format)
+        except Exception:
+            logger.exception("Conversion worker error on job %s", job_id)
+        finally:
+            _conversion_queue.task_done()
+
+# Probed input durations keyed by (path, size, mtime) — converting the same
+# upload to several formats shouldn't re-fork ffprobe to re-read the header
+_PROBE_CACHE: dict = {}
+_PROBE_CACHE_MAX = 256
+
+
+def _probe_cache_key(path) -> Optional[str]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return f"{path}:{st.st_size}:{int(st.st_mtime)}"
 
 # ---------------------------------------------------------------------------
-# Conversion job store  {job_id: {...}}
+# Stream metadata cache. A single playback session issues dozens of range
+# requests; resolving the job row, file path, size and MIME type once per
+# minute instead of once per request keeps the 206 path free of DB hits and
+# stat calls. Entries are dropped when jobs are deleted or the queue cleared.
 # ---------------------------------------------------------------------------
-conversion_jobs: dict = {}
+_RANGE_RE = re.compile(r"bytes=(\d*)-(\d*)")
+
+# ffmpeg prints 'Duration: HH:MM:SS.xx' on stderr while dumping the input;
+# matched on raw bytes so banner lines never need decoding
+_DURATION_RE = re.compile(rb"Duration: (\d+):(\d+):(\d+\.\d+)")
+
+_STREAM_META_CACHE: dict = {}  # job_id -> (expiry, file_path, file_size, content_type)
+_STREAM_META_TTL = 60.0
+_STREAM_META_MAX = 1024
+
+
+def _stream_meta_get(job_id: str):
+    entry = _STREAM_META_CACHE.get(job_id)
+    if entry and time.time() < entry[0]:
+        return entry
+    _STREAM_META_CACHE.pop(job_id, None)
+    return None
+
+
+def _stream_meta_put(job_id: str, file_path: str, file_size: int, content_type: str):
+    if len(_STREAM_META_CACHE) >= _STREAM_META_MAX:
+        _STREAM_META_CACHE.clear()
+    _STREAM_META_CACHE[job_id] = (
+        time.time() + _STREAM_META_TTL, file_path, file_size, content_type
+    )
+
+
+@functools.lru_cache(maxsize=64)
+def _guess_media_type(ext: str) -> str:
+    """mimetypes.guess_type memoized on the (tiny) set of extensions seen."""
+    content_type, _ = mimetypes.guess_type("f" + ext)
+    return content_type or "video/mp4"
+
+
+class LargeFileResponse(FileResponse):
+    """FileResponse tuned for multi-GB downloads.
+
+    Starlette's default is 64 KiB reads, so a 1 GiB file costs ~16k
+    read + send await cycles; 1 MiB reads cut that to ~1k. chunk_size is
+    only a class attribute on the pinned Starlette, hence the subclass.
+    """
+
+    chunk_size = 1 << 20
+
+
+def _stream_meta_invalidate(job_id: str = None):
+    if job_id is None:
+        _STREAM_META_CACHE.clear()
+    else:
+        _STREAM_META_CACHE.pop(job_id, None)
 
 
 # ---------------------------------------------------------------------------
@@ -118,9 +303,10 @@ class ConvertRequest(BaseModel):
 
     @validator("format")
     def validate_format(cls, v):
-        if v.lower() not in ALLOWED_CONVERT_FORMATS:
-            raise ValueError(f"Unsupported format '{v}'. Allowed: {sorted(ALLOWED_CONVERT_FORMATS)}")
-        return v.lower()
+        lowered = v.lower()
+        if lowered not in ALLOWED_CONVERT_FORMATS:
+            raise ValueError(f"Unsupported format '{v}'. Allowed: {_ALLOWED_CONVERT_HINT}")
+        return lowered
 
 
 class FetchRequest(BaseModel):
@@ -176,27 +362,92 @@ async def get_current_admin(current_user=Depends(get_current_user)):
 # ---------------------------------------------------------------------------
 # WebSocket manager
 # ---------------------------------------------------------------------------
+# orjson encodes the broadcast batches ~5-10x faster than the stdlib encoder
+def _ws_encode(obj) -> str:
+    return orjson.dumps(obj).decode()
+
+
 class ConnectionManager:
+    """Fan-out with per-connection writer tasks and a coalescing broadcaster.
+
+    Broadcasts land on a shared queue; a single background task drains it on
+    a 50 ms window, encodes the batch to JSON once, and hands the payload to
+    each connection's bounded queue. A slow client therefore only ever stalls
+    (and eventually drops frames on) its own writer, never the broadcaster
+    or the other clients.
+    """
+
+    FLUSH_INTERVAL = 0.05
+    SEND_QUEUE_MAX = 256
+
     def __init__(self):
-        self.active_connections: List[WebSocket] = []
+        self.active_connections: set = set()
+        self._send_queues: dict = {}  # WebSocket -> asyncio.Queue[str]
+        self._writer_tasks: dict = {}  # WebSocket -> asyncio.Task
+        self._broadcast_queue: Optional[asyncio.Queue] = None
+        self._broadcast_task: Optional[asyncio.Task] = None
 
     async def connect(self, websocket: WebSocket):
         await websocket.accept()
-        self.active_connections.append(websocket)
+        self.active_connections.add(websocket)
+        q: asyncio.Queue = asyncio.Queue(maxsize=self.SEND_QUEUE_MAX)
+        self._send_queues[websocket] = q
+        self._writer_tasks[websocket] = asyncio.create_task(
+            self._writer(websocket, q)
+        )
 
     def disconnect(self, websocket: WebSocket):
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
+        self.active_connections.discard(websocket)
+        self._send_queues.pop(websocket, None)
+        task = self._writer_tasks.pop(websocket, None)
+        if task is not None:
+            task.cancel()
+
+    async def _writer(self, websocket: WebSocket, q: asyncio.Queue):
+        try:
+            while True:
+                payload = await q.get()
+                await websocket.send_text(payload)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self.disconnect(websocket)
+
+    def ensure_broadcaster(self):
+        if self._broadcast_task is None or self._broadcast_task.done():
+            self._broadcast_queue = asyncio.Queue()
+            self._broadcast_task = asyncio.create_task(self._broadcaster())
+
+    def broadcast_nowait(self, message: dict):
+        if self._broadcast_queue is not None:
+            self._broadcast_queue.put_nowait(message)
 
     async def broadcast(self, message: dict):
-        dead = []
-        for conn in self.active_connections:
-            try:
-                await conn.send_json(message)
-            except Exception:
-                dead.append(conn)
-        for conn in dead:
-            self.disconnect(conn)
+        """Queue a message for the coalesced fan-out."""
+        self.ensure_broadcaster()
+        self._broadcast_queue.put_nowait(message)
+
+    async def _broadcaster(self):
+        while True:
+            batch = [await self._broadcast_queue.get()]
+            await asyncio.sleep(self.FLUSH_INTERVAL)
+            while True:
+                try:
+                    batch.append(self._broadcast_queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    break
+            # One encode for the whole window; clients unpack the array
+            payload = _ws_encode(batch)
+            for q in list(self._send_queues.values()):
+                try:
+                    q.put_nowait(payload)
+                except asyncio.QueueFull:
+                    # Shed the oldest frame for this client; newest wins
+                    try:
+                        q.get_nowait()
+                        q.put_nowait(payload)
+                    except (asyncio.QueueEmpty, asyncio.QueueFull):
+                        pass
 
 
 ws_manager = ConnectionManager()
@@ -204,7 +455,8 @@ manager = DownloadManager()
 
 
 async def broadcast_progress(data: dict):
-    await ws_manager.broadcast(data)
+    ws_manager.ensure_broadcaster()
+    ws_manager.broadcast_nowait(data)
 
 
 manager.set_progress_callback(broadcast_progress)
@@ -212,28 +464,66 @@ manager.set_progress_callback(broadcast_progress)
 # ---------------------------------------------------------------------------
 # Static files & templates
 # ---------------------------------------------------------------------------
-app.mount("/static", StaticFiles(directory="app/static"), name="static")
+class CachedStaticFiles(StaticFiles):
+    """StaticFiles that lets browsers cache assets instead of re-requesting.
+
+    Plain StaticFiles sends no Cache-Control, so every page navigation
+    re-fetches (or at best revalidates) each CSS/JS/image — a stat and open
+    in the Python process per asset per view. An hour of max-age keeps those
+    requests in the browser cache entirely; the assets aren't content-hashed,
+    so 'immutable' / year-long lifetimes would pin stale code across upgrades.
+    """
+
+    def file_response(self, *args, **kwargs):
+        response = super().file_response(*args, **kwargs)
+        response.headers.setdefault("Cache-Control", "public, max-age=3600")
+        return response
+
+
+app.mount("/static", CachedStaticFiles(directory="app/static"), name="static")
 templates = Jinja2Templates(directory="app/templates")
 
+# login.html's only input is the enable_registration flag and it never touches
+# the request object, so both variants render once and are served as plain
+# strings afterwards — the login page is the favourite target of credential
+# scanners, and this keeps their floods away from the Jinja engine. Keyed by
+# the flag itself, the cache needs no invalidation when settings change.
+_LOGIN_HTML: dict = {}
+
+
+def _login_html(enable_registration: bool) -> str:
+    html = _LOGIN_HTML.get(enable_registration)
+    if html is None:
+        html = _LOGIN_HTML[enable_registration] = templates.get_template(
+            "login.html"
+        ).render(enable_registration=enable_registration)
+    return html
+
 
 # ---------------------------------------------------------------------------
 # Utility helpers
 # ---------------------------------------------------------------------------
+_SANITIZE_RE = re.compile(r"[^\w.\-]")
+
+
 def sanitize_filename(filename: str) -> str:
     """Replace non-alphanumeric chars (except dots and dashes) with underscores."""
-    return re.sub(r"[^\w.\-]", "_", filename)
+    return _SANITIZE_RE.sub("_", filename)
 
 
 def parse_time_str(time_str: str) -> float:
     """Parse HH:MM:SS.mm to seconds."""
-    try:
-        if not time_str or time_str == "N/A":
-            return 0.0
-        parts = time_str.split(":")
-        if len(parts) == 3:
-            return int(parts[0]) * 3600 + int(parts[1]) * 60 + float(parts[2])
+    if not time_str or time_str == "N/A":
         return 0.0
-    except Exception:
+    # partition avoids the list allocation of split; malformed input is the
+    # rare case, so only the numeric conversion sits under the guard
+    hours, _, rest = time_str.partition(":")
+    minutes, _, seconds = rest.partition(":")
+    if not seconds:
+        return 0.0
+    try:
+        return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+    except ValueError:
         return 0.0
 
 
@@ -261,10 +551,7 @@ async def read_root(request: Request):
 @app.get("/login", response_class=HTMLResponse)
 @app.get("/register", response_class=HTMLResponse)
 async def login_page(request: Request):
-    return templates.TemplateResponse(
-        "login.html",
-        {"request": request, "enable_registration": config.get_settings().enable_registration},
-    )
+    return HTMLResponse(_login_html(config.get_settings().enable_registration))
 
 
 # ---------------------------------------------------------------------------
@@ -275,21 +562,37 @@ async def login_for_access_token(request: Request, form_data: OAuth2PasswordRequ
     client_ip = request.client.host
     now = time.time()
 
-    # Clean up stale attempt timestamps
-    login_attempts.setdefault(client_ip, [])
-    login_attempts[client_ip] = [t for t in login_attempts[client_ip] if now - t < 60]
-
-    # Rate limit: 5 attempts per minute
-    if len(login_attempts[client_ip]) >= 5:
-        wait_time = int(60 - (now - login_attempts[client_ip][0]))
-        raise HTTPException(
-            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-            detail=f"Too many failed attempts. Try again in {wait_time} seconds.",
-        )
-
-    user = db.get_user(form_data.username)
-    if not user or not verify_password(form_data.password, user["password_hash"]):
-        login_attempts[client_ip].append(now)
+    # Periodically drop IPs with no attempts in the last window so the dict
+    # can't grow without bound across an attack
+    global _attempts_last_sweep
+    if now - _attempts_last_sweep >= _ATTEMPTS_SWEEP_INTERVAL:
+        _attempts_last_sweep = now
+        stale = [ip for ip, d in login_attempts.items()
+                 if not d or now - d[-1] >= _LOGIN_WINDOW]
+        for ip in stale:
+            del login_attempts[ip]
+
+    # Read-only guard: the happy path (correct password, no recent
+    # failures) neither creates an entry nor allocates anything here
+    attempts = login_attempts.get(client_ip)
+    if attempts:
+        # Expire old timestamps from the left; O(1) per expired entry
+        while attempts and now - attempts[0] >= _LOGIN_WINDOW:
+            attempts.popleft()
+
+        # Rate limit: 5 attempts per minute
+        if len(attempts) >= _LOGIN_MAX_ATTEMPTS:
+            wait_time = int(_LOGIN_WINDOW - (now - attempts[0]))
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail=f"Too many failed attempts. Try again in {wait_time} seconds.",
+            )
+
+    user = await aauthenticate_user(form_data.username, form_data.password)
+    if not user:
+        if attempts is None:
+            attempts = login_attempts[client_ip] = deque(maxlen=_LOGIN_MAX_ATTEMPTS)
+        attempts.append(now)
         await asyncio.sleep(0.5)  # Constant-time delay to mitigate timing attacks
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -303,7 +606,7 @@ async def login_for_access_token(request: Request, form_data: OAuth2PasswordRequ
     # Transparently re-hash old pbkdf2_sha256 hashes to Argon2
     from app.core.auth import pwd_context
     if pwd_context.needs_update(user["password_hash"]):
-        db.change_password(user["id"], pwd_context.hash(form_data.password))
+        db.change_password(user["id"], await aget_password_hash(form_data.password))
         logger.info("Re-hashed password for user '%s' to Argon2", user["username"])
 
     access_token = create_access_token(
@@ -311,7 +614,7 @@ async def login_for_access_token(request: Request, form_data: OAuth2PasswordRequ
         expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES),
     )
 
-    response = JSONResponse(content={"access_token": access_token, "token_type": "bearer"})
+    response = ORJSONResponse(content={"access_token": access_token, "token_type": "bearer"})
     response.set_cookie(
         key="access_token",
         value=access_token,
@@ -367,10 +670,10 @@ async def register(user: UserCreate):
         raise HTTPException(status_code=422, detail=str(exc))
 
     user_id = str(uuid.uuid4())
-    pw_hash = get_password_hash(user.password)
-    
+    pw_hash = await aget_password_hash(user.password)
+
     # The first registered user is automatically an admin
-    role = "admin" if len(db.get_all_users()) == 0 else "user"
+    role = "admin" if db.count_users() == 0 else "user"
     
     success = db.create_user({"id": user_id, "username": user.username, "password_hash": pw_hash, "role": role})
     if not success:
@@ -397,11 +700,7 @@ async def websocket_endpoint(websocket: WebSocket):
 @app.post("/api/fetch")
 async def fetch_video_info(req: FetchRequest, current_user=Depends(get_current_user)):
     try:
-        loop = asyncio.get_event_loop()
-        info = await asyncio.wait_for(
-            loop.run_in_executor(None, manager.fetch_info, req.url),
-            timeout=30.0,
-        )
+        info = await asyncio.wait_for(manager.fetch_info(req.url), timeout=30.0)
         if not info:
             raise HTTPException(status_code=400, detail="Failed to fetch video info. Please check the URL.")
         return info
@@ -425,10 +724,11 @@ async def add_to_queue(req: QueueRequest, background_tasks: BackgroundTasks, cur
 @app.delete("/api/queue/{job_id}")
 @app.delete("/api/delete/{job_id}")
 async def delete_job(job_id: str, current_user=Depends(get_current_user)):
-    success = manager.remove_job(job_id)
+    success = await manager.remove_job(job_id)
     if not success:
         db.delete_job(job_id)
-    manager.reload_queue()
+    _stream_meta_invalidate(job_id)
+    await manager.reload_queue()
     return {"status": "deleted"}
 
 
@@ -503,7 +803,7 @@ async def move_to_library(req: LibraryMoveRequest, current_user=Depends(get_curr
     is_in_lib = 1 if req.in_library else 0
     is_in_dl = 0 if is_in_lib == 1 else (1 if req.in_downloads else 0)
     db.update_job_library_status(req.job_ids, is_in_library=is_in_lib, is_in_downloads=is_in_dl)
-    manager.reload_queue()
+    await manager.reload_queue()
     return {"status": "success", "message": "Jobs processed"}
 
 
@@ -512,7 +812,7 @@ async def add_to_library(req: LibraryAddRequest, current_user=Depends(get_curren
     if not req.job_ids:
         return {"status": "no_jobs_provided"}
     db.update_job_library_status(req.job_ids, is_in_library=1)
-    manager.reload_queue()
+    await manager.reload_queue()
     return {"status": "success", "added_count": len(req.job_ids)}
 
 
@@ -521,7 +821,7 @@ async def remove_from_library(req: LibraryAddRequest, current_user=Depends(get_c
     if not req.job_ids:
         return {"status": "no_jobs_provided"}
     db.update_job_library_status(req.job_ids, is_in_library=0)
-    manager.reload_queue()
+    await manager.reload_queue()
     return {"status": "success", "removed_count": len(req.job_ids)}
 
 
@@ -532,28 +832,29 @@ async def remove_from_library(req: LibraryAddRequest, current_user=Depends(get_c
 async def clear_queue(current_user=Depends(get_current_user)):
     db.clear_completed_jobs()
     db.clear_failed_jobs()
-    manager.reload_queue(None)
+    _stream_meta_invalidate()
+    await manager.reload_queue(None)
     return {"status": "cleared"}
 
 
 @app.post("/api/system/clear-completed")
 async def clear_completed_queue(current_user=Depends(get_current_user)):
     db.clear_completed_jobs()
-    manager.reload_queue(None)
+    _stream_meta_invalidate()
+    await manager.reload_queue(None)
     return {"status": "cleared_completed"}
 
 
 @app.post("/api/system/clear-failed")
 async def clear_failed_queue(current_user=Depends(get_current_user)):
     db.clear_failed_jobs()
-    manager.reload_queue(None)
+    await manager.reload_queue(None)
     return {"status": "cleared_failed"}
 
 
 @app.post("/api/system/update-ytdlp")
 async def update_ytdlp(background_tasks: BackgroundTasks, current_user=Depends(get_current_user)):
-    loop = asyncio.get_event_loop()
-    result = await loop.run_in_executor(None, manager.update_ytdlp)
+    result = await manager.update_ytdlp()
     if result["status"] == "error":
         raise HTTPException(status_code=500, detail=result["output"])
     return result
@@ -568,6 +869,8 @@ async def get_settings():
 async def update_settings(settings: SettingsModel, current_user=Depends(get_current_admin)):
     config.update_settings(settings)
     manager.download_dir = settings.download_dir
+    # Pooled extractor instances captured the old cookie settings
+    manager.invalidate_ydl_pool()
     os.makedirs(settings.download_dir, exist_ok=True)
     return {"status": "updated"}
 
@@ -595,7 +898,7 @@ async def increment_video_view(job_id: str, request: Request):
     updated_job = db.get_job(job_id)
     view_count = updated_job.get("view_count", 0)
 
-    response = JSONResponse(content={"views": view_count, "status": "success"})
+    response = ORJSONResponse(content={"views": view_count, "status": "success"})
     response.set_cookie(
         key=session_cookie_name,
         value="active",
@@ -609,7 +912,6 @@ async def increment_video_view(job_id: str, request: Request):
 
 @app.get("/api/download/{job_id}")
 async def download_video_file(job_id: str):
-    from fastapi.responses import FileResponse
     job_data = db.get_job(job_id)
     if not job_data:
         raise HTTPException(status_code=404, detail="Job not found")
@@ -622,13 +924,19 @@ async def download_video_file(job_id: str):
     if not os.path.isabs(file_path):
         file_path = os.path.join(manager.download_dir, file_path)
 
-    if not os.path.exists(file_path):
+    # One stat here doubles as the existence check and, passed through,
+    # saves FileResponse its own stat for Content-Length
+    try:
+        stat_result = os.stat(file_path)
+    except OSError:
         raise HTTPException(status_code=404, detail="File not found on server")
 
     filename = os.path.basename(file_path)
-    return FileResponse(
+    return LargeFileResponse(
         path=file_path,
         filename=filename,
+        stat_result=stat_result,
+        method="GET",
         content_disposition_type="attachment"
     )
 
@@ -656,44 +964,63 @@ async def get_live_video_stats(job_id: str):
 @app.get("/api/stream/{job_id}")
 async def stream_video(job_id: str, request: Request):
     """Stream video with HTTP 206 range support for seeking."""
-    job = manager.jobs.get(job_id)
-    job_data = job.dict() if job else db.get_job(job_id)
+    cached = _stream_meta_get(job_id)
+    if cached is not None:
+        _, file_path, file_size, content_type = cached
+    else:
+        job = manager.jobs.get(job_id)
+        job_data = job.dict() if job else db.get_job(job_id)
 
-    if not job_data:
-        raise HTTPException(status_code=404, detail="Job not found")
-    if job_data.get("status") != "completed":
-        raise HTTPException(status_code=400, detail="Video not ready")
+        if not job_data:
+            raise HTTPException(status_code=404, detail="Job not found")
+        if job_data.get("status") != "completed":
+            raise HTTPException(status_code=400, detail="Video not ready")
 
-    file_path = job_data.get("filename", "")
-    if not os.path.isabs(file_path):
-        candidate = os.path.join(manager.download_dir, file_path)
-        if os.path.exists(candidate):
-            file_path = candidate
+        # One stat per candidate path does the exists + size checks together
+        file_path = job_data.get("filename", "")
+        st = None
+        if not os.path.isabs(file_path):
+            candidate = os.path.join(manager.download_dir, file_path)
+            try:
+                st = os.stat(candidate)
+                file_path = candidate
+            except OSError:
+                st = None
+        if st is None:
+            try:
+                st = os.stat(file_path)
+            except OSError:
+                raise HTTPException(status_code=404, detail="File not found on server")
 
-    if not os.path.exists(file_path):
-        raise HTTPException(status_code=404, detail="File not found on server")
+        file_size = st.st_size
+        content_type = _guess_media_type(os.path.splitext(file_path)[1])
+        _stream_meta_put(job_id, file_path, file_size, content_type)
 
-    file_size = os.path.getsize(file_path)
-    content_type, _ = mimetypes.guess_type(file_path)
-    content_type = content_type or "video/mp4"
     range_header = request.headers.get("range")
 
-    if range_header:
+    range_match = _RANGE_RE.match(range_header) if range_header else None
+    if range_match:
         from fastapi.responses import StreamingResponse
 
-        range_match = range_header.replace("bytes=", "").split("-")
-        start = int(range_match[0]) if range_match[0] else 0
-        end = int(range_match[1]) if len(range_match) > 1 and range_match[1] else file_size - 1
-        start = max(0, min(start, file_size - 1))
+        start = int(range_match.group(1)) if range_match.group(1) else 0
+        end = int(range_match.group(2)) if range_match.group(2) else file_size - 1
+        if start >= file_size:
+            raise HTTPException(
+                status_code=416,
+                detail="Requested range not satisfiable",
+                headers={"Content-Range": f"bytes */{file_size}"},
+            )
         end = max(start, min(end, file_size - 1))
         content_length = end - start + 1
 
-        def iter_file():
+        # 1 MiB reads: a 1 GiB seek costs ~1k iterator round-trips instead
+        # of ~130k 8 KiB ones (each a threadpool hop through StreamingResponse)
+        def iter_file(chunk_size=1 << 20):
             with open(file_path, "rb") as f:
                 f.seek(start)
                 remaining = content_length
                 while remaining > 0:
-                    chunk = f.read(min(8192, remaining))
+                    chunk = f.read(min(chunk_size, remaining))
                     if not chunk:
                         break
                     remaining -= len(chunk)
@@ -710,10 +1037,11 @@ async def stream_video(job_id: str, request: Request):
             },
         )
 
-    return FileResponse(
+    return LargeFileResponse(
         path=file_path,
         media_type=content_type,
         filename=os.path.basename(file_path),
+        method="GET",
         headers={"Accept-Ranges": "bytes"},
     )
 
@@ -740,8 +1068,11 @@ async def video_player_page(job_id: str, request: Request, current_user=Depends(
                 info_path = base + ".info.json"
                 if os.path.exists(info_path):
                     try:
-                        with open(info_path, "r", encoding="utf-8") as f:
-                            info = json.load(f)
+                        # info.json can run to megabytes; read it off-loop
+                        # and let orjson parse the raw bytes in one C pass
+                        info = orjson.loads(
+                            await asyncio.to_thread(Path(info_path).read_bytes)
+                        )
                         job_data.setdefault("view_count", info.get("view_count"))
                         job_data.setdefault("description", info.get("description"))
                         job_data.setdefault("upload_date", info.get("upload_date"))
@@ -811,36 +1142,72 @@ async def browse_directory(path: str = None, current_user=Depends(get_current_us
 # ---------------------------------------------------------------------------
 # File conversion endpoints
 # ---------------------------------------------------------------------------
+def _persist_upload(src, file_path: Path) -> int:
+    """Copy a spooled upload to its destination with preallocation.
+
+    By the time the handler runs, FastAPI has already buffered the multipart
+    body into a (possibly disk-backed) temp file, so its exact size is known:
+    posix_fallocate reserves the extents up front — keeping large videos
+    contiguous for later sendfile streaming — and a single reused 1 MiB
+    bytearray with readinto avoids a fresh bytes object per chunk.
+    """
+    src.seek(0, os.SEEK_END)
+    size = src.tell()
+    src.seek(0)
+    if size > MAX_UPLOAD_BYTES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"File exceeds the {MAX_UPLOAD_BYTES // (1024 * 1024)} MB upload limit",
+        )
+    fd = os.open(file_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        if size and hasattr(os, "posix_fallocate"):  # absent on Windows/macOS
+            try:
+                os.posix_fallocate(fd, 0, size)
+            except OSError:
+                pass  # filesystem without fallocate support
+        buf = bytearray(1 << 20)
+        view = memoryview(buf)
+        while True:
+            n = src.readinto(buf)
+            if not n:
+                break
+            os.write(fd, view[:n])
+    finally:
+        os.close(fd)
+    return size
+
+
 @app.post("/api/convert/upload")
 async def upload_file(file: UploadFile = File(...)):
     safe_filename = sanitize_filename(file.filename)
     file_path = UPLOAD_DIR / safe_filename
+    # The copy is pure file-to-file I/O, so run it on a worker thread and
+    # keep the event loop (and the progress websocket) responsive
     try:
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        await asyncio.to_thread(_persist_upload, file.file, file_path)
+    except HTTPException:
+        # Size cap fires before anything is written; leave the path alone
+        raise
     except Exception as e:
         logger.error("Upload error: %s", e)
+        file_path.unlink(missing_ok=True)
         raise HTTPException(status_code=500, detail="Upload failed")
     return {"filename": safe_filename}
 
 
 @app.post("/api/convert/start")
-async def start_conversion(request: ConvertRequest, background_tasks: BackgroundTasks):
+async def start_conversion(request: ConvertRequest):
     job_id = str(uuid.uuid4())
-    conversion_jobs[job_id] = {
-        "status": "pending",
-        "progress": 0,
-        "filename": request.filename,
-        "format": request.format,
-        "error": "",
-    }
-    background_tasks.add_task(process_conversion, job_id, request.filename, request.format)
+    db.add_conversion(job_id, request.filename, request.format)
+    _ensure_conversion_workers()
+    _conversion_queue.put_nowait((job_id, request.filename, request.format))
     return {"job_id": job_id, "status": "started"}
 
 
 @app.get("/api/convert/status/{job_id}")
 async def get_conversion_status(job_id: str):
-    job = conversion_jobs.get(job_id)
+    job = db.get_conversion(job_id)
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
     return job
@@ -848,86 +1215,139 @@ async def get_conversion_status(job_id: str):
 
 @app.get("/api/convert/download/{filename}")
 async def download_converted_file(filename: str):
-    # Prevent path traversal
-    safe_name = Path(filename).name
-    file_path = CONVERT_DIR / safe_name
-    if not file_path.exists():
+    # Prevent path traversal: resolve the candidate and require it to sit
+    # directly inside the (pre-resolved) convert dir. Unlike Path(name).name
+    # this also rejects absolute paths and symlinks pointing elsewhere
+    # instead of silently reinterpreting them.
+    file_path = (CONVERT_DIR_RESOLVED / filename).resolve()
+    if file_path.parent != CONVERT_DIR_RESOLVED:
+        raise HTTPException(status_code=404, detail="File not found")
+    safe_name = file_path.name
+    try:
+        stat_result = os.stat(file_path)
+    except OSError:
         raise HTTPException(status_code=404, detail="File not found")
-    return FileResponse(path=file_path, filename=safe_name, media_type="application/octet-stream")
+    return LargeFileResponse(
+        path=file_path,
+        filename=safe_name,
+        stat_result=stat_result,
+        method="GET",
+        media_type="application/octet-stream",
+    )
 
 
-async def process_conversion(job_id: str, input_filename: str, target_format: str):
+async def _run_conversion(job_id: str, input_filename: str, target_format: str):
     try:
-        conversion_jobs[job_id]["status"] = "processing"
-        conversion_jobs[job_id]["progress"] = 0
+        db.update_conversion(job_id, status="processing", progress=0)
 
         input_path = UPLOAD_DIR / input_filename
         output_path = CONVERT_DIR / f"{input_path.stem}.{target_format}"
 
-        ffmpeg_path = shutil.which("ffmpeg")
-        if not ffmpeg_path:
-            bin_ffmpeg = os.path.join(os.getcwd(), "bin", "ffmpeg.exe")
-            if os.path.exists(bin_ffmpeg):
-                ffmpeg_path = bin_ffmpeg
+        # Resolved once at startup by the download manager; same binary
+        ffmpeg_path = manager.ffmpeg_path
         if not ffmpeg_path:
             raise RuntimeError("FFmpeg not found")
 
+        # Duration comes from ffmpeg's own stderr banner (parsed in the
+        # progress loop below) — no separate ffprobe fork needed. The cache
+        # still short-circuits the wait for re-encodes of the same input.
         total_duration = 0.0
-        ffprobe_path = str(ffmpeg_path).replace("ffmpeg", "ffprobe")
-        if os.path.exists(ffprobe_path):
-            try:
-                proc = await asyncio.create_subprocess_exec(
-                    ffprobe_path,
-                    "-v", "error",
-                    "-show_entries", "format=duration",
-                    "-of", "default=noprint_wrappers=1:nokey=1",
-                    str(input_path),
-                    stdout=asyncio.subprocess.PIPE,
-                    stderr=asyncio.subprocess.PIPE,
-                )
-                stdout, _ = await proc.communicate()
-                total_duration = float(stdout.decode().strip())
-            except Exception:
-                pass
+        probe_key = _probe_cache_key(input_path)
+        if probe_key is not None and probe_key in _PROBE_CACHE:
+            total_duration = _PROBE_CACHE[probe_key]
 
+        # Progress goes to stdout as ffmpeg's structured key=value blocks;
+        # stderr carries only the log (where the Duration banner lives), so
+        # neither reader has to filter the other's traffic.
         cmd = [
             str(ffmpeg_path), "-y",
-            "-progress", "pipe:2",
+            "-progress", "pipe:1",
             "-nostats",
+            "-threads", str(_FFMPEG_THREADS),
             "-i", str(input_path),
             str(output_path),
         ]
 
+        # 1 MiB stream buffers (default is 64 KiB): the readers below drain
+        # in bulk chunks, and the larger high-water mark keeps a bursty
+        # ffmpeg writing instead of blocking on a paused pipe. Also headroom
+        # against LimitOverrunError should a line-based read ever be used.
         process = await asyncio.create_subprocess_exec(
             *cmd,
-            stdout=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
             stderr=asyncio.subprocess.PIPE,
             stdin=asyncio.subprocess.DEVNULL,
+            limit=1 << 20,
         )
 
-        while True:
-            line_bytes = await process.stderr.readline()
-            if not line_bytes:
-                break
-            line = line_bytes.decode("utf-8", errors="ignore").strip()
-            if line.startswith("out_time=") and total_duration > 0:
-                current_seconds = parse_time_str(line.split("=", 1)[1].strip())
-                percent = min(99, max(0, (current_seconds / total_duration) * 100))
-                conversion_jobs[job_id]["progress"] = round(percent, 1)
-
+        async def scan_log():
+            # Pull the Duration banner out of the log, then keep draining so
+            # a chatty encode can't fill the pipe and stall ffmpeg
+            nonlocal total_duration
+            buf = bytearray()
+            while chunk := await process.stderr.read(65536):
+                if total_duration > 0:
+                    continue
+                buf += chunk
+                m = _DURATION_RE.search(buf)
+                if m:
+                    total_duration = (
+                        int(m.group(1)) * 3600
+                        + int(m.group(2)) * 60
+                        + float(m.group(3))
+                    )
+                    if probe_key is not None:
+                        if len(_PROBE_CACHE) >= _PROBE_CACHE_MAX:
+                            _PROBE_CACHE.clear()
+                        _PROBE_CACHE[probe_key] = total_duration
+                    del buf[:]
+                elif len(buf) > 65536:
+                    del buf[:-256]  # keep enough tail to span a split banner
+
+        async def read_progress():
+            buf = bytearray()
+            latest_us = -1
+            last_percent = -1.0
+            while chunk := await process.stdout.read(4096):
+                buf += chunk
+                if b"\n" not in buf:
+                    continue
+                lines = buf.split(b"\n")
+                buf = bytearray(lines.pop())  # keep the trailing partial line
+                for line_bytes in lines:
+                    # out_time_ms is microseconds despite the name (it equals
+                    # out_time_us); integer parse, no time-string splitting
+                    if line_bytes.startswith(b"out_time_ms="):
+                        try:
+                            latest_us = int(line_bytes[12:])
+                        except ValueError:
+                            pass
+                    elif line_bytes.startswith(b"progress="):
+                        # Block terminator: stage a snapshot for the batch
+                        # flusher (which owns the write cadence), gated on
+                        # half a percent of visible change
+                        if latest_us < 0 or total_duration <= 0:
+                            continue
+                        percent = min(99, max(0, (latest_us / 1e6 / total_duration) * 100))
+                        if abs(percent - last_percent) >= 0.5:
+                            last_percent = percent
+                            _progress_buffer[job_id] = round(percent, 1)
+
+        await asyncio.gather(scan_log(), read_progress())
         await process.wait()
         if process.returncode != 0:
             raise RuntimeError(f"FFmpeg exited with code {process.returncode}")
 
-        conversion_jobs[job_id]["status"] = "completed"
-        conversion_jobs[job_id]["progress"] = 100
-        conversion_jobs[job_id]["output_file"] = output_path.name
+        _progress_buffer.pop(job_id, None)
+        db.update_conversion(
+            job_id, status="completed", progress=100, output_file=output_path.name
+        )
         logger.info("Conversion complete: %s", output_path.name)
 
     except Exception as e:
         logger.exception("Conversion failed for job %s", job_id)
-        conversion_jobs[job_id]["status"] = "error"
-        conversion_jobs[job_id]["error"] = str(e)
+        _progress_buffer.pop(job_id, None)
+        db.update_conversion(job_id, status="error", error=str(e))
 
 
 # ---------------------------------------------------------------------------
@@ -935,13 +1355,13 @@ async def process_conversion(job_id: str, input_filename: str, target_format: st
 # ---------------------------------------------------------------------------
 @app.post("/api/queue/{job_id}/open")
 async def open_job_folder(job_id: str, current_user=Depends(get_current_user)):
-    manager.open_folder(job_id)
+    await manager.open_folder(job_id)
     return {"status": "opened"}
 
 
 @app.post("/api/open_downloads")
 async def open_downloads_folder(current_user=Depends(get_current_user)):
-    manager.open_folder()
+    await manager.open_folder()
     return {"status": "opened"}
 
 
@@ -949,8 +1369,15 @@ async def open_downloads_folder(current_user=Depends(get_current_user)):
 # User management (admin only)
 # ---------------------------------------------------------------------------
 @app.get("/api/users")
-async def get_all_users(current_user=Depends(get_current_admin)):
-    return db.get_all_users()
+async def get_all_users(limit: int = 50, offset: int = 0, current_user=Depends(get_current_admin)):
+    # Paged so a large install doesn't materialize (and serialize) every
+    # user row per admin view; the total rides along in a header.
+    limit = max(1, min(limit, 500))
+    offset = max(0, offset)
+    return ORJSONResponse(
+        db.get_all_users(limit=limit, offset=offset),
+        headers={"X-Total-Count": str(db.count_users())},
+    )
 
 
 @app.post("/api/users")
@@ -965,7 +1392,7 @@ async def create_user_admin(user: UserCreateAdmin, current_user=Depends(get_curr
         raise HTTPException(status_code=422, detail=str(exc))
 
     user_id = str(uuid.uuid4())
-    pw_hash = get_password_hash(user.password)
+    pw_hash = await aget_password_hash(user.password)
     success = db.create_user({"id": user_id, "username": user.username, "password_hash": pw_hash, "role": user.role, "is_active": 1})
     if not success:
         raise HTTPException(status_code=500, detail="Failed to create user")
@@ -986,8 +1413,7 @@ async def update_user(user_id: str, update: UserUpdate, current_user=Depends(get
 @app.post("/api/users/{user_id}/reset-password")
 async def reset_user_password(user_id: str, reset: PasswordReset, current_user=Depends(get_current_admin)):
     # Look up target user so we can check username containment
-    all_users = db.get_all_users()
-    target = next((u for u in all_users if u["id"] == user_id), None)
+    target = db.get_user_by_id(user_id)
     target_username = target["username"] if target else None
 
     try:
@@ -995,7 +1421,7 @@ async def reset_user_password(user_id: str, reset: PasswordReset, current_user=D
     except ValueError as exc:
         raise HTTPException(status_code=422, detail=str(exc))
 
-    pw_hash = get_password_hash(reset.password)
+    pw_hash = await aget_password_hash(reset.password)
     db.change_password(user_id, pw_hash)
     return {"status": "password_reset"}
 
@@ -1005,9 +1431,8 @@ async def delete_user(user_id: str, current_user=Depends(get_current_admin)):
     if user_id == current_user["id"]:
         raise HTTPException(status_code=400, detail="Cannot delete your own account")
         
-    all_users = db.get_all_users()
-    target = next((u for u in all_users if u["id"] == user_id), None)
-    
+    target = db.get_user_by_id(user_id)
+
     if not target:
         raise HTTPException(status_code=404, detail="User not found")
         
@@ -1033,20 +1458,62 @@ async def startup_event():
 
     if old_dl_dir.exists() and old_dl_dir.is_dir() and old_dl_dir != lib_dir:
         logger.info("Migrating files from %s to %s", old_dl_dir, lib_dir)
-        for item in old_dl_dir.iterdir():
-            if item.is_file():
-                dest = lib_dir / item.name
-                try:
-                    if not dest.exists():
-                        shutil.move(str(item), str(dest))
-                    else:
-                        item.unlink()
-                except Exception as e:
-                    logger.warning("Error migrating %s: %s", item.name, e)
-        try:
-            shutil.rmtree(str(old_dl_dir))
-        except Exception as e:
-            logger.warning("Could not remove old download dir: %s", e)
+
+        # Empty library: one rename relinks the whole directory, no per-file
+        # work at all
+        migrated = False
+        if not any(lib_dir.iterdir()):
+            try:
+                lib_dir.rmdir()
+                os.rename(old_dl_dir, lib_dir)
+                migrated = True
+            except OSError:
+                lib_dir.mkdir(parents=True, exist_ok=True)
+
+        if not migrated:
+            # scandir's DirEntry.is_file() answers from the directory walk
+            # itself — no stat per entry like Path.is_file()
+            with os.scandir(old_dl_dir) as entries:
+                for entry in entries:
+                    if not entry.is_file(follow_symlinks=False):
+                        continue
+                    dest = lib_dir / entry.name
+                    try:
+                        # link + unlink moves by inode relink and, unlike
+                        # rename, refuses to clobber an existing library
+                        # copy — EAFP instead of a dest.exists() stat per
+                        # file
+                        try:
+                            os.link(entry.path, dest)
+                        except FileExistsError:
+                            pass  # keep the library's copy, drop the old one
+                        except OSError:
+                            # different filesystem: fall back to copying
+                            if not dest.exists():
+                                shutil.move(entry.path, str(dest))
+                                continue
+                        os.unlink(entry.path)
+                    except Exception as e:
+                        logger.warning("Error migrating %s: %s", entry.name, e)
+            try:
+                shutil.rmtree(str(old_dl_dir))
+            except Exception as e:
+                logger.warning("Could not remove old download dir: %s", e)
+
+    # Conversions interrupted by a restart: jobs that never started re-run
+    # from their inputs; half-written encodes can't resume, so mark them
+    for row in db.get_conversions_by_status("processing"):
+        db.update_conversion(row["id"], status="error",
+                             error="Interrupted by server restart")
+    queued_conversions = db.get_conversions_by_status("queued")
+    if queued_conversions:
+        _ensure_conversion_workers()
+        for row in queued_conversions:
+            _conversion_queue.put_nowait((row["id"], row["input"], row["target_format"]))
+
+    # Warm the yt-dlp player-JS cache in the background so the first real
+    # fetch doesn't pay for it
+    asyncio.create_task(manager.warm_player_js())
 
 
 @app.on_event("shutdown")
@@ -366,10 +366,12 @@ function connectWebSocket() {
         // console.log("[WS] Message:", event.data);
         try {
             const data = JSON.parse(event.data);
-            if (data.type === 'progress') {
-                // console.log(`[WS] Speed: ${data.speed} ETA: ${data.eta}`);
+            // Server coalesces updates into arrays; older frames are single objects
+            if (Array.isArray(data)) {
+                data.forEach(handleWsMessage);
+            } else {
+                handleWsMessage(data);
             }
-            handleWsMessage(data);
         } catch (e) {
             console.error("[WS] Parse error", e);
         }
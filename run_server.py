@@ -15,13 +15,14 @@ from pathlib import Path
 # ── 1. Load .env file if present ──────────────────────────────────────────
 env_path = Path(__file__).parent / ".env"
 if env_path.exists():
-    with open(env_path) as f:
-        for line in f:
-            line = line.strip()
-            if not line or line.startswith("#") or "=" not in line:
-                continue
-            key, _, value = line.partition("=")
-            os.environ.setdefault(key.strip(), value.strip())
+    # python-dotenv handles quoting/escapes the hand-rolled parser didn't;
+    # real env vars still win over file values, as setdefault did before
+    from dotenv import dotenv_values
+
+    os.environ.update({
+        k: v for k, v in dotenv_values(env_path).items()
+        if v is not None and k not in os.environ
+    })
     print(f"[INFO] Loaded environment from {env_path}")
 else:
     print(f"[WARN] No .env file found at {env_path}")
@@ -4,25 +4,31 @@ import time
 
 BASE_URL = "http://127.0.0.1:8001"
 
+# One session for the whole script: the TCP connection (and TLS handshake,
+# when fronted by a proxy) is reused across requests instead of being
+# re-established per call.
+SESSION = requests.Session()
+
 def login():
     print("--- Logging in ---")
     try:
-        res = requests.post(f"{BASE_URL}/token", data={"username": "admin", "password": "admin123"})
+        res = SESSION.post(f"{BASE_URL}/token", data={"username": "admin", "password": "admin123"})
         if res.status_code == 200:
             token = res.json()["access_token"]
             print(f"Login success. Token: {token[:10]}...")
-            return {"Authorization": f"Bearer {token}"}
+            SESSION.headers.update({"Authorization": f"Bearer {token}"})
+            return True
         else:
             print(f"Login failed: {res.text}")
-            return None
+            return False
     except Exception as e:
         print(f"Login Error: {e}")
-        return None
+        return False
 
-def test_queue(headers):
+def test_queue():
     print("--- Fetching Queue ---")
     try:
-        res = requests.get(f"{BASE_URL}/api/queue", headers=headers)
+        res = SESSION.get(f"{BASE_URL}/api/queue")
         if res.status_code != 200:
             print(f"Error: {res.status_code} {res.text}")
             return
@@ -34,19 +40,18 @@ def test_queue(headers):
     except Exception as e:
         print(f"Error: {e}")
 
-def test_clear(headers):
+def test_clear():
     print("\n--- Clearing Queue (API) ---")
     try:
-        res = requests.post(f"{BASE_URL}/api/system/clear-queue", headers=headers)
+        res = SESSION.post(f"{BASE_URL}/api/system/clear-queue")
         print(f"Status: {res.status_code}")
         print(f"Response: {res.json()}")
     except Exception as e:
         print(f"Error: {e}")
 
 if __name__ == "__main__":
-    headers = login()
-    if headers:
-        test_queue(headers)
-        test_clear(headers)
+    if login():
+        test_queue()
+        test_clear()
         time.sleep(1)
-        test_queue(headers)
+        test_queue()